@@ -1,32 +1,540 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 import pandas as pd
+import numpy as np
 from datetime import datetime, timedelta
 import os
 import tkinter.font as tkFont
+import queue
+import re
+import threading
+import time
+from collections import namedtuple, deque, Counter
+from itertools import islice
+
+import sqlite3
+
+from excel_cache import load_excel_cached
+from db_empleados import DB_FILE, SELECT_EMPLEADO, ScanStore, connect, current_session_key, import_roster
+from scan_metrics import ScanMetrics
+from export_empleados import ReportSection, write_report
+from config_empleados import load_config
+
+# Cada cuánto se revisa si el Excel de la plantilla cambió (recarga en caliente).
+# Un cambio se aplica cuando la fecha y el tamaño del archivo se mantienen entre dos
+# revisiones seguidas, para no leer un archivo que todavía se está copiando.
+ROSTER_POLL_MS = 5000
+
+# Cada cuánto se revisa si el hilo escritor de ScanStore reportó lotes sin guardar
+SCAN_STORE_POLL_MS = 1000
+
+# Columnas de HDC.xlsx que usa la app (las demás no se leen) y las de pocos valores distintos,
+# que se normalizan a mayúsculas y se cargan como categóricas
+ROSTER_USECOLS = ['Empleado', 'Nombre', 'LINEA', 'Puesto', 'POSITION', 'F Servicio']
+ROSTER_CATEGORICAL = ['LINEA', 'Puesto', 'POSITION']
+
+# Tiempo sin teclear (ms) antes de aplicar la búsqueda en "Ver Registros"
+SEARCH_DEBOUNCE_MS = 150
+
+# Tablas de "Ver Registros": filas que se materializan por página (lo visible más un margen)
+# y fracción desplazada a partir de la cual se carga la página siguiente
+VIRTUAL_PAGE_SIZE = 100
+VIRTUAL_PRELOAD_FRACTION = 0.9
+
+# Origen de la plantilla en tiempo de ejecución:
+#   'excel'  -> DataFrame en memoria (leído del Excel o de su caché) + EmployeeIndex
+#   'sqlite' -> el Excel se importa a la tabla 'empleados' de db.sqlite y cada escaneo
+#               es una consulta puntual (no se materializa la plantilla completa)
+ROSTER_BACKEND = 'excel'
+
+# Retroalimentación de escaneo (barra de estado): colores, duración del destello y pitido en errores
+FEEDBACK_COLORS = {"success": "#28a745", "info": "#007bff", "warning": "#e67e22", "error": "#dc3545"}
+FEEDBACK_FLASH_MS = 1500
+SCAN_BEEP = True
+
+# Días de servicio a partir de los cuales un empleado se considera con experiencia
+EXPERIENCE_DAYS = 90
+
+# Modo multilínea: cada línea tiene su propia sesión (escaneos, contadores y programación)
+# y todas comparten la misma plantilla. Con False hay una sola sesión para todas las líneas.
+MULTI_LINE_SESSIONS = True
+
+# Atajo (oculto) que abre la ventana de diagnóstico con los tiempos de escaneo
+DIAGNOSTICS_SHORTCUT = "<Control-Shift-D>"
+DIAGNOSTICS_REFRESH_MS = 1000
+
+# Registro compacto de un empleado de la plantilla (solo los campos que usa la app)
+EmployeeRecord = namedtuple('EmployeeRecord', ['Nombre', 'LINEA', 'Puesto', 'POSITION', 'F_Servicio', 'Antiguedad_Anos', 'Antiguedad_Dias', 'Experiencia'])
+
+
+def seniority_as_of_today():
+    """Fecha de corte para la antigüedad: hoy a las 00:00."""
+    return pd.Timestamp.now().normalize()
+
+
+def compute_seniority(f_servicio, as_of):
+    """
+    Calcula la antigüedad de muchas fechas de servicio a la vez contra un mismo día de corte.
+    Devuelve tres arreglos de NumPy: años (1 decimal), días y experiencia (> EXPERIENCE_DAYS).
+    Las fechas vacías o inválidas cuentan como 0 años, 0 días y sin experiencia.
+    """
+    dates = pd.to_datetime(pd.Series(f_servicio, dtype=object), errors='coerce')
+    delta_days = (as_of - dates).dt.days
+    valid = delta_days.notna().to_numpy()
+    days = delta_days.fillna(0).astype('int64').to_numpy()
+    years = np.round(days / 365.25, 1)
+    return years, days, valid & (days > EXPERIENCE_DAYS)
+
+
+# Campos numéricos de una línea del archivo de un lector (txt/csv), con o sin comillas
+# ("12347" en los CSV que exportan algunos lectores), de cualquier longitud.
+# Así se ignoran encabezados y fechas u horas con separadores (2024-01-05, 08:00).
+BADGE_FIELD_RE = re.compile(r'(?:^|[,;\t ])"?(\d+)"?(?=$|[,;\t ])')
+
+# Fechas y fechas-hora sin separadores (AAAAMMDD, AAAAMMDDhhmm, AAAAMMDDhhmmss) con las que
+# algunos lectores empiezan cada línea: son numéricas, pero nunca son un número de empleado
+DATE_FIELD_RE = re.compile(r'(?:19|20)\d{2}(?:0[1-9]|1[0-2])(?:0[1-9]|[12]\d|3[01])(?:\d{4}|\d{6})?')
+
+
+def read_badge_file(path):
+    """
+    Lee el archivo descargado de un lector de gafetes. El número de empleado de cada línea
+    es el primer campo numérico que no es una fecha.
+    Devuelve (números de empleado en orden, líneas no vacías sin un número reconocible),
+    las líneas como (número de línea, texto) para mostrarlas en el resumen.
+    """
+    with open(path, encoding='utf-8-sig', errors='replace') as f:
+        lines = pd.Series(f.read().splitlines(), dtype=object).str.strip()
+    fields = lines.str.extractall(BADGE_FIELD_RE)[0].astype(object)
+    fields = fields[~fields.str.fullmatch(DATE_FIELD_RE).astype(bool)]
+    ids = fields.groupby(level=0).first().reindex(lines.index)
+    unrecognized = ids.isna() & (lines != '')
+    skipped = list(zip((lines.index[unrecognized] + 1).tolist(), lines[unrecognized].tolist()))
+    return ids.dropna().tolist(), skipped
+
+
+def seniority_of(f_servicio, as_of):
+    """Versión escalar de compute_seniority, para búsquedas puntuales."""
+    if pd.isna(f_servicio) or not isinstance(f_servicio, (datetime, pd.Timestamp)):
+        return 0.0, 0, False
+    days = (as_of - pd.Timestamp(f_servicio)).days
+    return round(days / 365.25, 1), days, days > EXPERIENCE_DAYS
+
+
+# F_Servicio de los escaneados se guarda como días desde 1970-01-01; NAT_DAY = fecha vacía
+NS_PER_DAY = 86_400 * 10**9
+NAT_DAY = np.iinfo(np.int64).min
+
+
+def to_epoch_day(f_servicio):
+    """Convierte una fecha de servicio a día epoch (int); las vacías o inválidas a NAT_DAY."""
+    if pd.isna(f_servicio) or not isinstance(f_servicio, (datetime, pd.Timestamp)):
+        return NAT_DAY
+    return pd.Timestamp(f_servicio).value // NS_PER_DAY
+
+
+def to_epoch_days(f_servicio):
+    """Versión vectorizada de to_epoch_day para muchas fechas a la vez."""
+    dates = pd.to_datetime(pd.Series(f_servicio, dtype=object), errors='coerce')
+    ns = dates.to_numpy(dtype='datetime64[ns]').view(np.int64)
+    return np.where(dates.isna().to_numpy(), NAT_DAY, ns // NS_PER_DAY)
+
+
+def seniority_days(epoch_days, as_of):
+    """Días de antigüedad de muchos días epoch contra el día de corte (0 para NAT_DAY)."""
+    epoch_days = np.asarray(epoch_days, dtype=np.int64)
+    return np.where(epoch_days != NAT_DAY, as_of.value // NS_PER_DAY - epoch_days, 0)
+
+
+def normalize_category(value):
+    """Forma canónica de Linea/Puesto/POSITION: texto sin espacios extremos y en mayúsculas."""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return 'N/A'
+    return str(value).strip().upper()
+
+
+class CategoryCodes:
+    """
+    Asigna un código entero estable a cada texto distinto (y conserva el texto de cada código).
+    Los textos se normalizan (normalize_category) solo la primera vez que aparecen, así que
+    'f50' y 'F50' comparten código y las comparaciones posteriores son entre enteros.
+    """
+    __slots__ = ('codes', 'values')
+
+    def __init__(self):
+        self.codes = {}
+        self.values = []
+
+    def code(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            key = normalize_category(value)
+            code = self.codes.get(key)
+            if code is None:
+                code = self.codes[key] = len(self.values)
+                self.values.append(key)
+            if isinstance(value, str):
+                self.codes[value] = code
+        return code
+
+
+# Códigos compartidos por todos los registros escaneados de todas las sesiones
+LINE_CODES = CategoryCodes()
+PUESTO_CODES = CategoryCodes()
+POSITION_CODES = CategoryCodes()
+
+# Códigos que se comparan en estadísticas y pestañas
+MFGUPO = POSITION_CODES.code('MFGUPO')
+QAINSP = POSITION_CODES.code('QAINSP')
+MFGSUP = PUESTO_CODES.code('MFGSUP')
+
+
+# Pestañas de la ventana de registros (y hojas del reporte exportado)
+TAB_NAMES = ["Todos", "Op. con Experiencia", "Op. sin Experiencia", "Soportes", "Calidad", "Op. Prestados"]
+
+
+def belongs_to_tab(tab_name, position_code, puesto_code, linea_code, experienced, line_code):
+    """Indica si un empleado (por sus códigos categóricos) va en una pestaña; line_code es la línea activa."""
+    if tab_name == "Todos":
+        return True
+    if tab_name == "Op. con Experiencia":
+        return position_code == MFGUPO and experienced
+    if tab_name == "Op. sin Experiencia":
+        return position_code == MFGUPO and not experienced
+    if tab_name == "Soportes":
+        return position_code == MFGUPO and puesto_code == MFGSUP # Asumiendo 'mfgsup' para soportes
+    if tab_name == "Calidad":
+        return position_code == QAINSP
+    if tab_name == "Op. Prestados":
+        return position_code == MFGUPO and line_code is not None and linea_code != line_code
+    return False
+
+
+def report_rows(items, line):
+    """
+    Lista de (valores, pestañas) de cada empleado de una sesión para export_empleados.
+    Se arma en el hilo de Tk: el hilo de exportación solo recibe datos planos, sin tocar
+    LINE_CODES ni los registros que _check_date_rollover actualiza.
+    """
+    line_code = LINE_CODES.code(line) if line else None
+    rows = []
+    for employee_id, emp in items:
+        f_servicio = emp.F_Servicio
+        values = (line or '', employee_id, emp.Nombre, emp.Linea, emp.Puesto, emp.POSITION,
+                  None if pd.isna(f_servicio) else f_servicio.to_pydatetime(),
+                  emp.Antiguedad_Anos, emp.Antiguedad_Dias, "Sí" if emp.Experiencia else "No")
+        tabs = {tab_name for tab_name in TAB_NAMES
+                if belongs_to_tab(tab_name, emp.position_code, emp.puesto_code, emp.linea_code, emp.Experiencia, line_code)}
+        rows.append((values, tabs))
+    return rows
+
+
+def normalize_roster(df):
+    """Normaliza una sola vez la plantilla recién leída: textos limpios y columnas categóricas en mayúsculas."""
+    if 'Empleado' in df.columns:
+        df['Empleado'] = df['Empleado'].astype(str).str.strip()
+    if 'Nombre' in df.columns:
+        df['Nombre'] = df['Nombre'].fillna('N/A').astype(str).str.strip()
+    for col in ROSTER_CATEGORICAL:
+        if col in df.columns:
+            # Se normalizan solo los valores distintos (pocos), no cada fila; 'f50' y 'F50' quedan en una categoría
+            raw = df[col].astype('category')
+            normalized = [normalize_category(c) for c in raw.cat.categories] + ['N/A']
+            categories = list(dict.fromkeys(normalized))
+            remap = np.array([categories.index(value) for value in normalized], dtype=np.int64)
+            # Las celdas vacías tienen código -1, que en remap es la última posición ('N/A')
+            df[col] = pd.Categorical.from_codes(remap[raw.cat.codes.to_numpy()], categories=categories)
+    return df
+
+
+def empty_roster():
+    """Plantilla vacía con el mismo esquema que una cargada (se usa si el Excel falta o no se puede leer)."""
+    df = pd.DataFrame({col: pd.Series(dtype=object) for col in ROSTER_USECOLS})
+    df['F Servicio'] = pd.Series(dtype='datetime64[ns]')
+    for col in ROSTER_CATEGORICAL:
+        df[col] = df[col].astype('category')
+    return df
+
+
+class ScannedEmployee:
+    """
+    Empleado escaneado en formato compacto: __slots__, códigos categóricos para
+    Linea/Puesto/POSITION y F_Servicio como día epoch. Años y experiencia se derivan
+    de Antiguedad_Dias. Se lee como el dict anterior (emp_data['Linea'], .get(...)).
+    """
+    __slots__ = ('Nombre', 'linea_code', 'puesto_code', 'position_code', 'f_servicio_day', 'Antiguedad_Dias')
+
+    FIELDS = ('Nombre', 'Linea', 'Puesto', 'POSITION', 'F_Servicio', 'Antiguedad_Anos', 'Antiguedad_Dias', 'Experiencia')
+
+    def __init__(self, nombre, linea, puesto, position, f_servicio_day, antiguedad_dias):
+        self.Nombre = nombre
+        self.linea_code = LINE_CODES.code(linea)
+        self.puesto_code = PUESTO_CODES.code(puesto)
+        self.position_code = POSITION_CODES.code(position)
+        self.f_servicio_day = f_servicio_day
+        self.Antiguedad_Dias = antiguedad_dias
+
+    @classmethod
+    def from_dict(cls, data):
+        """Crea el registro a partir del formato dict (el de ScanStore.load_session)."""
+        return cls(data['Nombre'], data['Linea'], data['Puesto'], data['POSITION'],
+                   to_epoch_day(data.get('F_Servicio')), int(data.get('Antiguedad_Dias', 0)))
+
+    @property
+    def Linea(self):
+        return LINE_CODES.values[self.linea_code]
+
+    @property
+    def Puesto(self):
+        return PUESTO_CODES.values[self.puesto_code]
+
+    @property
+    def POSITION(self):
+        return POSITION_CODES.values[self.position_code]
+
+    @property
+    def F_Servicio(self):
+        if self.f_servicio_day == NAT_DAY:
+            return pd.NaT
+        return pd.Timestamp(self.f_servicio_day * NS_PER_DAY)
+
+    @property
+    def Antiguedad_Anos(self):
+        return round(self.Antiguedad_Dias / 365.25, 1)
+
+    @property
+    def Experiencia(self):
+        # Las fechas vacías tienen 0 días, así que nunca cuentan como experiencia
+        return self.Antiguedad_Dias > EXPERIENCE_DAYS
+
+    def __getitem__(self, key):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self.FIELDS else default
+
+
+class EmployeeIndex:
+    """
+    Índice hash de la plantilla: número de empleado -> registro compacto.
+    Se construye una sola vez después de cargar el Excel para que cada escaneo
+    sea una búsqueda O(1) en lugar de recorrer todo el DataFrame.
+    """
+    # Columna del Excel -> valor por defecto si la columna no existe o viene vacía
+    COLUMNS = (('Nombre', 'N/A'), ('LINEA', 'N/A'), ('Puesto', 'N/A'), ('POSITION', 'N/A'), ('F Servicio', pd.NaT))
+
+    def __init__(self, df, as_of=None):
+        # Si un empleado aparece repetido se conserva la primera fila, igual que el iloc[0] anterior
+        if 'Empleado' in df.columns:
+            df = df.drop_duplicates(subset='Empleado', keep='first')
+            ids = df['Empleado'].astype(str).tolist()
+        else:
+            ids = []
+
+        # Listas de Python por columna: el acceso escalar es mucho más rápido que con .iloc
+        self._columns = []
+        for col, default in self.COLUMNS:
+            if col in df.columns:
+                self._columns.append(df[col].tolist())
+            else:
+                self._columns.append([default] * len(ids))
+
+        self._positions = dict(zip(ids, range(len(ids))))
+
+        # Antigüedad precalculada para toda la plantilla (se recalcula solo al cambiar el día)
+        self.refresh_seniority(as_of if as_of is not None else seniority_as_of_today())
+
+    def refresh_seniority(self, as_of):
+        """Recalcula en bloque la antigüedad de toda la plantilla contra el día de corte dado."""
+        self.as_of = as_of
+        years, days, experienced = compute_seniority(self._columns[-1], as_of)
+        self._seniority = [years.tolist(), days.tolist(), experienced.tolist()]
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __contains__(self, employee_id):
+        return employee_id in self._positions
+
+    def get(self, employee_id):
+        """Devuelve el EmployeeRecord del empleado o None si no existe."""
+        pos = self._positions.get(employee_id)
+        if pos is None:
+            return None
+        return EmployeeRecord(*(values[pos] for values in self._columns), *(values[pos] for values in self._seniority))
+
+    def close(self):
+        """No hay recursos que liberar (misma interfaz que SqliteEmployeeIndex)."""
+
+
+class SqliteEmployeeIndex:
+    """
+    Misma interfaz que EmployeeIndex, pero cada búsqueda es una consulta puntual
+    sobre la tabla 'empleados' (clave primaria 'numero').
+    """
+    def __init__(self, path=DB_FILE, as_of=None):
+        # La conexión se crea en el hilo de carga y se usa después desde el hilo de Tk
+        self._conn = connect(path, check_same_thread=False)
+        try:
+            self._len = self._conn.execute("SELECT COUNT(*) FROM empleados").fetchone()[0]
+        except sqlite3.Error:
+            self._conn.close()
+            raise
+        self.as_of = as_of if as_of is not None else seniority_as_of_today()
+
+    def refresh_seniority(self, as_of):
+        """La antigüedad se calcula en cada consulta; solo se actualiza el día de corte."""
+        self.as_of = as_of
+
+    def __len__(self):
+        return self._len
+
+    def __contains__(self, employee_id):
+        return self.get(employee_id) is not None
+
+    def get(self, employee_id):
+        """Devuelve el EmployeeRecord del empleado o None si no existe."""
+        row = self._conn.execute(SELECT_EMPLEADO, (employee_id,)).fetchone()
+        if row is None:
+            return None
+        nombre, linea, puesto, position, f_servicio = row
+        f_servicio = pd.Timestamp(f_servicio) if f_servicio else pd.NaT
+        return EmployeeRecord(
+            nombre if nombre is not None else 'N/A',
+            linea if linea is not None else 'N/A',
+            puesto if puesto is not None else 'N/A',
+            position if position is not None else 'N/A',
+            f_servicio,
+            *seniority_of(f_servicio, self.as_of),
+        )
+
+    def close(self):
+        """Cierra la conexión (al reemplazar la plantilla en una recarga o al cerrar la app)."""
+        self._conn.close()
+
+
+class StatsAggregator:
+    """
+    Contadores incrementales de los empleados escaneados.
+    Cada alta actualiza los totales en O(1) y guarda un conteo por línea, así que
+    cambiar la línea activa tampoco requiere recorrer los registros.
+    """
+    def __init__(self):
+        self.total = 0
+        self.mfgupo = 0
+        self.qainsp = 0
+        self.experienced = 0
+        self.by_line = Counter() # código de línea (LINE_CODES) -> empleados escaneados de esa línea
+
+    def add(self, emp_data):
+        """Suma un empleado recién registrado (ScannedEmployee) a todos los contadores."""
+        self.total += 1
+        if emp_data.position_code == MFGUPO:
+            self.mfgupo += 1
+        elif emp_data.position_code == QAINSP:
+            self.qainsp += 1
+        if emp_data.Experiencia:
+            self.experienced += 1
+        self.by_line[emp_data.linea_code] += 1
+
+    @property
+    def inexperienced(self):
+        return self.total - self.experienced
+
+    def not_in_line(self, line):
+        """Empleados escaneados que no pertenecen a la línea indicada."""
+        if not line:
+            return 0
+        return self.total - self.by_line[LINE_CODES.code(line)]
+
+
+class LineSession:
+    """Escaneos, contadores y totales programados de una línea."""
+
+    def __init__(self, line):
+        self.line = line
+        # Formato: {employee_id: ScannedEmployee}
+        self.scanned_employees_data = {}
+        self.stats = StatsAggregator()
+        self.programmed_total_employees = 0
+        self.programmed_total_operadores = 0
+        self.programmed_total_soportes = 0
+        self.programmed_total_calidad = 0
+
+
+def _session_attribute(name):
+    """Propiedad de App que lee y escribe el atributo `name` de la sesión de la línea activa."""
+    return property(lambda self: getattr(self.active_session, name),
+                    lambda self, value: setattr(self.active_session, name, value))
 
-# Nombre del archivo Excel
-EXCEL_FILE = 'hdc.xlsx'
 
 class App:
+    # Estado por línea: siempre se refiere a la sesión de la línea activa
+    scanned_employees_data = _session_attribute('scanned_employees_data')
+    stats = _session_attribute('stats')
+    programmed_total_employees = _session_attribute('programmed_total_employees')
+    programmed_total_operadores = _session_attribute('programmed_total_operadores')
+    programmed_total_soportes = _session_attribute('programmed_total_soportes')
+    programmed_total_calidad = _session_attribute('programmed_total_calidad')
+
     def __init__(self, master):
         self.master = master
         master.title("Control de Empleados")
+
+        # Archivo de la plantilla, líneas válidas y ruta del reporte (config.ini)
+        self.config = load_config()
+        self.excel_file = self.config.archivo_datos
         master.geometry("870x580") # Tamaño ajustado para una mejor distribución general
         master.resizable(False, False) # NO permitir redimensionar la ventana
 
-        self.df_employees = pd.DataFrame()
-        self.load_excel_data()
-
-        # Almacena los empleados escaneados únicos y sus detalles
-        # Formato: {employee_id: {'Nombre': str, 'Linea': str, 'Puesto': str, 'Antiguedad_Anos': float, 'Antiguedad_Dias': int, 'F_Servicio': datetime, 'POSITION': str}}
-        self.scanned_employees_data = {}
+        # Día de corte de la antigüedad; al cambiar el día se recalcula todo una vez
+        self.seniority_as_of = seniority_as_of_today()
 
-        # Inicialización de totales programados
-        self.programmed_total_employees = 0
-        self.programmed_total_operadores = 0
-        self.programmed_total_soportes = 0
-        self.programmed_total_calidad = 0
+        self.df_employees = pd.DataFrame()
+        self.roster_cache_hit = False
+        self.employee_index = EmployeeIndex(self.df_employees, self.seniority_as_of)
+
+        # La plantilla se carga en un hilo de fondo; mientras tanto los escaneos se encolan
+        self.roster_ready = False
+        self.pending_scans = deque()
+        self._scan_drain_after_id = None
+        self._feedback_after_id = None
+        self._roster_queue = queue.Queue()
+        self._roster_loading = False
+        self._roster_reload = False # True si la carga en curso es una recarga en caliente
+        self._roster_signature = None # (mtime_ns, tamaño) del Excel de la plantilla en uso
+        self._pending_signature = None # Cambio visto en la última revisión, a la espera de estabilizarse
+        self._roster_watch_after_id = None
+
+        # Exportación del reporte en un hilo de fondo (una a la vez)
+        self._export_thread = None
+        self._export_queue = queue.Queue()
+
+        # Tiempos por etapa de cada escaneo (ventana de diagnóstico y log rotativo)
+        self.metrics = ScanMetrics()
+        self._diagnostics_window = None
+
+        # Una sesión por línea (todas comparten employee_index); cambiar de línea solo cambia active_session.
+        # employee_sessions indica en qué sesión quedó registrado cada empleado (un empleado, una línea por turno).
+        self.lines = list(self.config.lineas_validas)
+        self.line_sessions = {}
+        self.employee_sessions = {}
+        self.active_session = self._line_session(self.lines[0])
+
+        # Último texto mostrado en cada etiqueta de estadísticas (evita .config innecesarios)
+        self._label_texts = {}
+
+        # Los escaneos del turno se guardan en SQLite; al reiniciar se recupera la sesión actual
+        self.session_key = current_session_key()
+        self.scan_store = None
+        try:
+            self.scan_store = ScanStore(DB_FILE)
+            self.restore_session()
+            self.master.after(SCAN_STORE_POLL_MS, self._poll_scan_store_errors)
+        except sqlite3.Error as e:
+            messagebox.showwarning("Base de Datos", f"No se pudo abrir '{DB_FILE}'. Los escaneos no se guardarán: {e}", parent=self.master)
 
         self.create_widgets()
         self.update_stats_labels() # Inicializar etiquetas de estadísticas
@@ -34,18 +542,201 @@ class App:
 
         # Mantener el foco en txt_escaneo cuando la ventana principal está activa
         master.bind("<FocusIn>", self._set_focus_on_scan_entry)
+        master.protocol("WM_DELETE_WINDOW", self.on_close)
+        master.bind(DIAGNOSTICS_SHORTCUT, lambda event: self.open_diagnostics_window())
+
+        # La ventana ya está visible; ahora cargar la plantilla sin bloquear la interfaz
+        self.start_roster_load()
+
+    def _line_session(self, line):
+        """Devuelve (creándola la primera vez) la sesión de una línea."""
+        key = line if MULTI_LINE_SESSIONS else None
+        session = self.line_sessions.get(key)
+        if session is None:
+            session = self.line_sessions[key] = LineSession(key)
+        return session
+
+    def restore_session(self):
+        """Recupera los escaneos ya guardados del turno actual (una sola consulta), cada uno en la sesión de su línea."""
+        restored = self.scan_store.load_session(self.session_key)
+        records = [ScannedEmployee.from_dict(emp_data) for _, _, emp_data in restored]
+        days = seniority_days([record.f_servicio_day for record in records], self.seniority_as_of).tolist()
+        for i, (employee_id, line, _) in enumerate(restored):
+            records[i].Antiguedad_Dias = days[i]
+            # Los escaneos guardados antes del modo multilínea no tienen línea: van a la primera
+            session = self._line_session(line or self.lines[0])
+            self.add_scanned_employee(employee_id, records[i], persist=False, session=session)
+        if restored:
+            print(f"Sesión {self.session_key} recuperada: {len(restored)} empleados escaneados")
+
+    def on_close(self):
+        """Guarda los escaneos pendientes antes de cerrar la aplicación."""
+        if self.metrics.total_scans:
+            self.metrics.log_summary()
+        if self.scan_store is not None:
+            self.scan_store.close()
+        self.employee_index.close()
+        self.master.destroy()
+
+    def _poll_scan_store_errors(self):
+        """Muestra en la barra de estado los lotes de escaneos que el hilo escritor no pudo guardar."""
+        message = None
+        while True:
+            try:
+                message = self.scan_store.errors.get_nowait()
+            except queue.Empty:
+                break
+        if message is not None:
+            self.show_scan_feedback(message, "error")
+        self.master.after(SCAN_STORE_POLL_MS, self._poll_scan_store_errors)
+
+    def start_roster_load(self, reload=False):
+        """Lanza la carga (o recarga en caliente) de la plantilla en un hilo de fondo."""
+        self._roster_loading = True
+        self._roster_reload = reload
+        # La firma se toma antes de leer: si el archivo cambia durante la carga, la siguiente revisión lo detecta
+        self._roster_signature = self._stat_roster()
+        worker = threading.Thread(target=self._roster_worker, daemon=True)
+        worker.start()
+        self.master.after(50, self._poll_roster_queue)
+
+    def _roster_worker(self):
+        """Cuerpo del hilo de carga: siempre deja un resultado en la cola, aunque la carga falle."""
+        try:
+            result = self.load_excel_data()
+        except Exception as e:
+            # Sin esto el hilo moriría en silencio y la barra de estado se quedaría en 'Cargando plantilla...'
+            print(f"Error inesperado al cargar la plantilla: {e}")
+            df = empty_roster()
+            result = (df, EmployeeIndex(df, self.seniority_as_of), False,
+                      ("error", "Error de Carga", f"No se pudo cargar la plantilla: {e}"))
+        self._roster_queue.put(result)
+
+    def _poll_roster_queue(self):
+        """Revisa (desde el hilo de Tk) si el hilo de carga ya terminó."""
+        try:
+            result = self._roster_queue.get_nowait()
+        except queue.Empty:
+            self.master.after(50, self._poll_roster_queue)
+            return
+        self._roster_loading = False
+        if self._roster_reload:
+            self._on_roster_reloaded(*result)
+        else:
+            self._on_roster_loaded(*result)
+        if self._roster_watch_after_id is None:
+            self._roster_watch_after_id = self.master.after(ROSTER_POLL_MS, self._watch_roster)
+
+    def _stat_roster(self):
+        """(mtime_ns, tamaño) del Excel de la plantilla, o None si no existe."""
+        try:
+            st = os.stat(self.excel_file)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _watch_roster(self):
+        """Revisión periódica del Excel: si cambió (y ya no está cambiando) se recarga en segundo plano."""
+        self._roster_watch_after_id = self.master.after(ROSTER_POLL_MS, self._watch_roster)
+        if self._roster_loading:
+            return
+        signature = self._stat_roster()
+        if signature is None or signature == self._roster_signature:
+            self._pending_signature = None
+            return
+        if signature != self._pending_signature:
+            # Primer aviso del cambio: esperar una revisión más por si la copia sigue en curso
+            self._pending_signature = signature
+            return
+        self._pending_signature = None
+        self.lbl_roster_status.config(text="Actualizando plantilla...", foreground="#e67e22")
+        self.start_roster_load(reload=True)
+
+    def _on_roster_reloaded(self, df, index, cache_hit, notice):
+        """Instala la plantilla recargada en un solo paso; si falló se sigue usando la anterior."""
+        if notice is not None:
+            self.lbl_roster_status.config(text=f"Plantilla lista ({len(self.employee_index)} empleados)", foreground="#28a745")
+            self.show_scan_feedback(f"No se pudo actualizar la plantilla; se sigue usando la anterior. {notice[2]}", "warning")
+            index.close()
+            return
+        if index.as_of != self.seniority_as_of:
+            index.refresh_seniority(self.seniority_as_of)
+        # Los escaneos corren en este mismo hilo, así que nunca ven una plantilla a medias
+        previous = self.employee_index
+        self.df_employees, self.employee_index = df, index
+        # La plantilla anterior ya no se usa: en modo sqlite esto libera su conexión a la base
+        previous.close()
+        self.roster_cache_hit = cache_hit
+        self.lbl_roster_status.config(text=f"Plantilla actualizada {datetime.now():%H:%M} ({len(index)} empleados)", foreground="#28a745")
 
     def load_excel_data(self):
-        """Carga los datos del archivo Excel 'hdc.xlsx'."""
-        if os.path.exists(EXCEL_FILE):
+        """
+        Carga los datos del archivo Excel de la plantilla (config.ini) y construye el índice de búsqueda.
+        Se ejecuta en el hilo de fondo, por lo que no toca ningún widget: devuelve
+        (df, índice, cache_hit, aviso) y el aviso, si lo hay, lo muestra el hilo de Tk.
+        """
+        notice = None
+        cache_hit = False
+        if ROSTER_BACKEND == 'sqlite':
+            return self._load_roster_sqlite()
+        if os.path.exists(self.excel_file):
             try:
-                self.df_employees = pd.read_excel(EXCEL_FILE, dtype={'Empleado': str}, parse_dates=['F Servicio'])
+                # La caché en disco evita volver a parsear el Excel si no ha cambiado
+                df, cache_hit = load_excel_cached(self.excel_file, self._read_roster_excel, variant='hdc-v2')
+                print(f"Plantilla '{self.excel_file}' cargada ({'caché' if cache_hit else 'Excel, caché regenerada'}): {len(df)} filas")
             except Exception as e:
-                messagebox.showerror("Error de Carga", f"No se pudo cargar el archivo Excel: {e}", parent=self.master)
-                self.df_employees = pd.DataFrame(columns=['Empleado', 'Nombre', 'Localidad', 'Turno', 'F Servicio', 'Departamento', 'LINEA', 'Puesto', 'Categoria', 'POSITION', 'FUNCTION', 'Proceso', 'Departamento'])
+                notice = ("error", "Error de Carga", f"No se pudo cargar el archivo Excel: {e}")
+                df = empty_roster()
         else:
-            messagebox.showwarning("Archivo no encontrado", f"El archivo '{EXCEL_FILE}' no se encontró en el directorio actual. Por favor, asegúrese de que el archivo exista y tenga los encabezados correctos.", parent=self.master)
-            self.df_employees = pd.DataFrame(columns=['Empleado', 'Nombre', 'Localidad', 'Turno', 'F Servicio', 'Departamento', 'LINEA', 'Puesto', 'Categoria', 'POSITION', 'FUNCTION', 'Proceso', 'Departamento'])
+            notice = ("warning", "Archivo no encontrado", f"El archivo '{self.excel_file}' no se encontró en el directorio actual. Por favor, asegúrese de que el archivo exista y tenga los encabezados correctos.")
+            df = empty_roster()
+
+        # Construir el índice de búsqueda (con la antigüedad ya calculada) una sola vez por carga
+        return df, EmployeeIndex(df, self.seniority_as_of), cache_hit, notice
+
+    def _load_roster_sqlite(self):
+        """Variante de load_excel_data para ROSTER_BACKEND = 'sqlite'."""
+        notice = None
+        up_to_date = False
+        try:
+            if os.path.exists(self.excel_file):
+                # Solo se reimporta si el Excel cambió desde la última importación
+                up_to_date = not import_roster(self.excel_file, DB_FILE)
+                print(f"Plantilla '{self.excel_file}' {'ya importada' if up_to_date else 'importada'} en '{DB_FILE}'")
+            else:
+                notice = ("warning", "Archivo no encontrado", f"El archivo '{self.excel_file}' no se encontró. Se usará la plantilla ya importada en '{DB_FILE}'.")
+            index = SqliteEmployeeIndex(DB_FILE, self.seniority_as_of)
+        except (sqlite3.Error, OSError, ValueError) as e:
+            notice = ("error", "Error de Carga", f"No se pudo cargar la plantilla desde '{DB_FILE}': {e}")
+            index = EmployeeIndex(pd.DataFrame(columns=['Empleado']))
+        # En este modo la plantilla completa no se materializa en memoria
+        return pd.DataFrame(), index, up_to_date, notice
+
+    def _on_roster_loaded(self, df, index, cache_hit, notice):
+        """Instala la plantilla cargada y procesa en orden los escaneos que quedaron en cola."""
+        self.df_employees = df
+        self.employee_index = index
+        if index.as_of != self.seniority_as_of:
+            index.refresh_seniority(self.seniority_as_of) # El día cambió mientras se cargaba
+        self.roster_cache_hit = cache_hit
+        self.roster_ready = True
+
+        if notice is not None:
+            kind, title, message = notice
+            if kind == "error":
+                messagebox.showerror(title, message, parent=self.master)
+            else:
+                messagebox.showwarning(title, message, parent=self.master)
+
+        self.lbl_roster_status.config(text=f"Plantilla lista ({len(index)} empleados)", foreground="#28a745")
+
+        self._drain_scan_queue()
+
+    @staticmethod
+    def _read_roster_excel(path):
+        """Lee del Excel solo las columnas que usa la app (únicamente cuando la caché no es válida)."""
+        df = pd.read_excel(path, usecols=lambda col: col in ROSTER_USECOLS, dtype={'Empleado': str}, parse_dates=['F Servicio'])
+        return normalize_roster(df)
 
     def create_widgets(self):
         """Crea y organiza los widgets en la ventana principal."""
@@ -161,6 +852,26 @@ class App:
         self.txt_escaneo.pack(pady=(0, 10), padx=10, fill=tk.X, expand=True) 
         self.txt_escaneo.bind("<Return>", self.process_scan)
 
+        # Resultado del último escaneo (reemplaza a los messagebox para no bloquear el lector)
+        self.lbl_scan_feedback = tk.Label(scan_frame, text="Listo para escanear", font=("Arial", 11, "bold"), anchor="w",
+                                          background="#FFFFFF", foreground="#555", padx=6, pady=4, wraplength=380, justify="left")
+        self.lbl_scan_feedback.pack(pady=(0, 5), padx=10, fill=tk.X)
+
+        # Estado de la carga de la plantilla (se actualiza cuando termina el hilo de fondo)
+        self.lbl_roster_status = ttk.Label(scan_frame, text="Cargando plantilla...", font=("Arial", 10, "italic"), foreground="#e67e22", background="#FFFFFF")
+        self.lbl_roster_status.pack(pady=(0, 5), padx=10, anchor="w")
+
+        # Importación de los registros descargados de lectores portátiles
+        style.configure("Lote.TButton", font=("Arial", 10, "bold"), padding=4)
+        file_buttons_frame = ttk.Frame(scan_frame)
+        file_buttons_frame.pack(pady=(0, 8), padx=10, anchor="w")
+        self.btn_importar_lote = ttk.Button(file_buttons_frame, text="Importar Lote de Escaneos...", command=self.open_bulk_import, style="Lote.TButton")
+        self.btn_importar_lote.pack(side=tk.LEFT)
+
+        # Reporte del turno (xlsx/csv) en la ruta de config.ini
+        self.btn_exportar = ttk.Button(file_buttons_frame, text="Exportar Reporte...", command=self.open_export, style="Lote.TButton")
+        self.btn_exportar.pack(side=tk.LEFT, padx=(8, 0))
+
         # Sección de Selección de Línea
         line_frame = ttk.LabelFrame(left_panel, text="Línea Activa", padding="1") 
         line_frame.grid(row=1, column=0, sticky="nsew", pady=5) 
@@ -171,10 +882,14 @@ class App:
         ttk.Label(line_frame, text="Seleccione la Línea de Trabajo:", style="SubTitle.TLabel").pack(pady=5, anchor="w", padx=10)
         
         # Combobox
-        self.lines = ["F37", "F45", "F50", "F60", "F62", "F63", "F66", "F71", "F84", "F86", "T31", "T32", "T33", "T34"]
         self.cb_lines = ttk.Combobox(line_frame, values=self.lines, state="readonly", font=("Arial", 11), style="TCombobox")
         self.cb_lines.pack(pady=10, padx=10, fill=tk.X, expand=True) 
-        self.cb_lines.bind("<<ComboboxSelected>>", self.update_stats_labels)
+        self.cb_lines.bind("<<ComboboxSelected>>", self.switch_line)
+
+        # Resumen de las sesiones abiertas (modo multilínea)
+        self.lbl_line_sessions = ttk.Label(line_frame, text="", font=("Arial", 10), foreground="#555", background="#FFFFFF", wraplength=380)
+        if MULTI_LINE_SESSIONS:
+            self.lbl_line_sessions.pack(pady=(0, 5), padx=10, anchor="w")
 
         if self.lines:
             self.cb_lines.set(self.lines[0]) 
@@ -293,113 +1008,349 @@ class App:
         """Procesa el número de empleado escaneado."""
         employee_id = self.txt_escaneo.get().strip()
         self.txt_escaneo.delete(0, tk.END)
+        self.txt_escaneo.focus_set()
 
         if not employee_id:
-            messagebox.showwarning("Entrada Vacía", "Por favor, escanee o ingrese un número de empleado.", parent=self.master)
-            self.txt_escaneo.focus_set()
+            self.show_scan_feedback("Por favor, escanee o ingrese un número de empleado.", "warning")
+            return
+
+        # El <Return> del lector solo encola; el registro se hace fuera del manejador de teclado
+        # para que los escaneos seguidos (a velocidad de lector) no pierdan teclas
+        # Se guarda el momento del <Return> para medir la latencia completa del escaneo
+        self.pending_scans.append((str(employee_id), time.perf_counter()))
+
+        if not self.roster_ready:
+            # La plantilla todavía se está cargando: se procesará en orden al terminar
+            self.lbl_roster_status.config(text=f"Cargando plantilla... ({len(self.pending_scans)} escaneos en cola)")
             return
 
-        employee_id = str(employee_id)
+        if self._scan_drain_after_id is None:
+            self._scan_drain_after_id = self.master.after_idle(self._drain_scan_queue)
+
+    def _drain_scan_queue(self):
+        """Procesa en orden todos los escaneos en cola y refresca estadísticas y tablas una sola vez."""
+        self._scan_drain_after_id = None
+        self._check_shift_rollover() # Un escaneo del turno nuevo no debe caer en la sesión anterior
+        registered = False
+        batch = []
+        while self.pending_scans:
+            employee_id, enqueued_at = self.pending_scans.popleft()
+            batch.append(enqueued_at)
+            registered = self.handle_scan(employee_id, refresh=False) or registered
+        self._refresh_after_scan(registered)
+
+        finished_at = time.perf_counter()
+        for enqueued_at in batch:
+            self.metrics.record('total', finished_at - enqueued_at)
+        if batch:
+            self.metrics.mark_scan(len(batch))
+
+    def _refresh_after_scan(self, registered):
+        """Refresca tablas (<<ScanUpdate>>) y estadísticas, midiendo cada etapa."""
+        if registered:
+            # event_generate ejecuta en el acto los binds de las ventanas abiertas
+            with self.metrics.stage('tablas'):
+                self.master.event_generate("<<ScanUpdate>>")
+        with self.metrics.stage('estadisticas'):
+            self.update_stats_labels()
 
-        employee_info = self.df_employees[self.df_employees['Empleado'] == employee_id]
+    def handle_scan(self, employee_id, refresh=True):
+        """Registra un número de empleado ya validado contra la plantilla. Devuelve True si se registró."""
+        with self.metrics.stage('busqueda'):
+            employee_info = self.employee_index.get(employee_id)
+        registered = False
 
-        if employee_info.empty:
-            messagebox.showerror("Empleado No Encontrado", f"El empleado con ID '{employee_id}' no se encontró en la base de datos.", parent=self.master)
+        if employee_info is None:
+            self.show_scan_feedback(f"Empleado '{employee_id}' no encontrado en la base de datos.", "error")
         else:
-            if employee_id in self.scanned_employees_data:
-                messagebox.showinfo("Duplicado", f"El empleado {employee_id} ya ha sido registrado.", parent=self.master)
+            owner = self.employee_sessions.get(employee_id)
+            if owner is self.active_session:
+                self.show_scan_feedback(f"El empleado {employee_id} ya ha sido registrado.", "warning")
+            elif owner is not None:
+                self.show_scan_feedback(f"El empleado {employee_id} ya está registrado en la línea {owner.line}.", "warning")
             else:
-                row = employee_info.iloc[0]
-                nombre = row.get('Nombre', 'N/A')
-                linea = row.get('LINEA', 'N/A')
-                puesto = row.get('Puesto', 'N/A')
-                position = row.get('POSITION', 'N/A')
-                f_servicio = row.get('F Servicio', pd.NaT)
-
-                antiguedad_anos, antiguedad_dias = self.calculate_antiguedad(f_servicio)
-
-                self.scanned_employees_data[employee_id] = {
-                    'Nombre': nombre,
-                    'Linea': linea,
-                    'Puesto': puesto,
-                    'POSITION': position,
-                    'Antiguedad_Anos': antiguedad_anos,
-                    'Antiguedad_Dias': antiguedad_dias,
-                    'F_Servicio': f_servicio
-                }
-                messagebox.showinfo("Registro Exitoso", f"Empleado {employee_id} - {nombre} registrado correctamente.", parent=self.master)
-
-                self.master.event_generate("<<ScanUpdate>>")
+                nombre = employee_info.Nombre
+
+                with self.metrics.stage('registro'):
+                    self.add_scanned_employee(employee_id, ScannedEmployee(
+                        nombre,
+                        employee_info.LINEA,
+                        employee_info.Puesto,
+                        employee_info.POSITION,
+                        to_epoch_day(employee_info.F_Servicio),
+                        employee_info.Antiguedad_Dias,
+                    ))
+                self.show_scan_feedback(f"Empleado {employee_id} - {nombre} registrado correctamente.", "success")
+                registered = True
+
+        if refresh:
+            self._refresh_after_scan(registered)
+        return registered
+
+    def show_scan_feedback(self, message, kind):
+        """Muestra el resultado del escaneo en la barra de estado con un destello de color (sin bloquear)."""
+        color = FEEDBACK_COLORS[kind]
+        self.lbl_scan_feedback.config(text=message, background=color, foreground="white")
+        if kind in ("warning", "error") and SCAN_BEEP:
+            self.master.bell()
+        # Tras el destello la barra vuelve al fondo normal, conservando el último mensaje
+        if self._feedback_after_id is not None:
+            self.master.after_cancel(self._feedback_after_id)
+        self._feedback_after_id = self.master.after(FEEDBACK_FLASH_MS, self._reset_scan_feedback, color)
+
+    def _reset_scan_feedback(self, color):
+        self._feedback_after_id = None
+        self.lbl_scan_feedback.config(background="#FFFFFF", foreground=color)
+
+    def open_bulk_import(self):
+        """Pide el archivo de un lector portátil y registra todos sus escaneos de una vez."""
+        if not self.roster_ready:
+            messagebox.showwarning("Plantilla", "La plantilla todavía se está cargando. Intente de nuevo en unos segundos.", parent=self.master)
+            return
+        path = filedialog.askopenfilename(parent=self.master, title="Archivo del lector de gafetes",
+                                          filetypes=[("Registros de lector", "*.txt *.csv"), ("Todos los archivos", "*.*")])
+        if not path:
+            return
+        try:
+            employee_ids, skipped = read_badge_file(path)
+        except OSError as e:
+            messagebox.showerror("Error de Lectura", f"No se pudo leer el archivo: {e}", parent=self.master)
+            return
 
+        summary = self.bulk_register(employee_ids)
+
+        message = (f"Escaneos en el archivo: {len(employee_ids)}\n"
+                   f"Registrados: {summary['registered']}\n"
+                   f"Duplicados: {summary['duplicates']}\n"
+                   f"No encontrados: {len(summary['unknown'])}")
+        if summary['unknown']:
+            message += "\n\nIDs no encontrados: " + ", ".join(summary['unknown'][:20])
+            if len(summary['unknown']) > 20:
+                message += f" ...y {len(summary['unknown']) - 20} más"
+        if skipped:
+            # Encabezados incluidos: así se ve si el lector exportó un formato que no se reconoce
+            message += f"\n\nLíneas sin número de empleado reconocible: {len(skipped)}\n"
+            message += "\n".join(f"  Línea {number}: {text[:60]}" for number, text in skipped[:5])
+            if len(skipped) > 5:
+                message += f"\n  ...y {len(skipped) - 5} más"
+        messagebox.showinfo("Importación de Lote", message, parent=self.master)
+        self.txt_escaneo.focus_set()
 
+    def bulk_register(self, employee_ids):
+        """
+        Registra muchos números de empleado de una sola vez.
+        Se resuelven todos contra la plantilla con un solo merge y las estadísticas y tablas
+        se refrescan una sola vez al final. Devuelve el resumen de registrados, duplicados y no encontrados.
+        """
+        self._check_shift_rollover()
+        scans = pd.DataFrame({'Empleado': pd.Series(employee_ids, dtype=object).astype(str).str.strip()})
+        # Duplicado = repetido dentro del archivo o ya registrado en alguna línea del turno
+        duplicated = scans['Empleado'].duplicated() | scans['Empleado'].isin(self.employee_sessions.keys())
+        candidates = scans[~duplicated]
+
+        if not self.df_employees.empty:
+            # 'Empleado' ya viene como texto normalizado desde normalize_roster
+            roster = self.df_employees.drop_duplicates(subset='Empleado', keep='first')
+            merged = candidates.merge(roster, on='Empleado', how='left', indicator=True, sort=False)
+            found = merged[merged['_merge'] == 'both']
+            unknown = merged.loc[merged['_merge'] == 'left_only', 'Empleado'].tolist()
+
+            def column(name, default):
+                return found[name].tolist() if name in found.columns else [default] * len(found)
+
+            epoch_days = to_epoch_days(column('F Servicio', pd.NaT))
+            days = seniority_days(epoch_days, self.seniority_as_of)
+            new_records = [
+                (employee_id, ScannedEmployee(nombre, linea, puesto, position, fecha, dias))
+                for employee_id, nombre, linea, puesto, position, fecha, dias in zip(
+                    found['Empleado'], column('Nombre', 'N/A'), column('LINEA', 'N/A'), column('Puesto', 'N/A'),
+                    column('POSITION', 'N/A'), epoch_days.tolist(), days.tolist())
+            ]
+        else:
+            # Plantilla en SQLite (sin DataFrame en memoria): una consulta puntual por ID
+            new_records, unknown = [], []
+            for employee_id in candidates['Empleado']:
+                info = self.employee_index.get(employee_id)
+                if info is None:
+                    unknown.append(employee_id)
+                    continue
+                new_records.append((employee_id, ScannedEmployee(
+                    info.Nombre, info.LINEA, info.Puesto, info.POSITION, to_epoch_day(info.F_Servicio), info.Antiguedad_Dias)))
+
+        for employee_id, emp_data in new_records:
+            self.add_scanned_employee(employee_id, emp_data)
+
+        # Un solo refresco para todo el lote
+        if new_records:
+            self.master.event_generate("<<ScanUpdate>>")
         self.update_stats_labels()
-        self.txt_escaneo.focus_set()
 
-    def calculate_antiguedad(self, f_servicio):
-        """Calcula la antigüedad en años y días desde la fecha de servicio."""
-        if pd.isna(f_servicio) or not isinstance(f_servicio, (datetime, pd.Timestamp)):
-            return 0.0, 0
+        return {'registered': len(new_records), 'duplicates': int(duplicated.sum()), 'unknown': unknown}
+
+    def open_export(self):
+        """Pide dónde guardar el reporte (por defecto la ruta de config.ini) y lo exporta en segundo plano."""
+        default_path = self.config.archivo_exportado
+        path = filedialog.asksaveasfilename(parent=self.master, title="Exportar reporte del turno",
+                                            initialdir=os.path.dirname(os.path.abspath(default_path)),
+                                            initialfile=os.path.basename(default_path), defaultextension=".xlsx",
+                                            filetypes=[("Libro de Excel", "*.xlsx"), ("CSV", "*.csv")])
+        if path:
+            self.export_report(path)
+
+    def _report_sections(self):
+        """Instantánea (en el hilo de Tk) de las sesiones con registros o programación, lista para exportar."""
+        sections = []
+        for session in self.line_sessions.values():
+            if not session.stats.total and not session.programmed_total_employees:
+                continue
+            stats = session.stats
+            operadores = stats.total - stats.mfgupo - stats.qainsp
+            programmed_total = session.programmed_total_operadores + session.programmed_total_soportes + session.programmed_total_calidad
+            summary = [
+                ("Operadores", session.programmed_total_operadores, operadores),
+                ("Soportes", session.programmed_total_soportes, stats.mfgupo),
+                ("Calidad", session.programmed_total_calidad, stats.qainsp),
+                ("Total", programmed_total, stats.total),
+                ("Con experiencia", None, stats.experienced),
+                ("Sin experiencia", None, stats.inexperienced),
+            ]
+            rows = report_rows(session.scanned_employees_data.items(), session.line)
+            sections.append(ReportSection(session.line, rows, summary))
+        return sections
+
+    def export_report(self, path):
+        """Exporta el reporte a `path` en un hilo de fondo; el resultado se muestra en la barra de escaneo."""
+        if self._export_thread is not None and self._export_thread.is_alive():
+            self.show_scan_feedback("Ya hay una exportación en curso.", "warning")
+            return
+        sections = self._report_sections()
 
-        today = datetime.now()
-        delta = today - f_servicio
+        def work():
+            try:
+                total = write_report(path, sections, TAB_NAMES)
+                self._export_queue.put(("success", f"Reporte exportado: {total} empleados en '{path}'."))
+            except Exception as e:
+                # Cualquier error debe llegar a la cola; si no, la barra se quedaría en 'Exportando reporte...'
+                self._export_queue.put(("error", f"No se pudo exportar el reporte: {e}"))
 
-        years = delta.days / 365.25
-        days = delta.days
+        self._export_thread = threading.Thread(target=work, name="ExportReport", daemon=True)
+        self._export_thread.start()
+        self.show_scan_feedback("Exportando reporte...", "info")
+        self.master.after(100, self._poll_export_queue)
 
-        return round(years, 1), delta.days
+    def _poll_export_queue(self):
+        """Revisa (desde el hilo de Tk) si la exportación terminó."""
+        try:
+            kind, message = self._export_queue.get_nowait()
+        except queue.Empty:
+            self.master.after(100, self._poll_export_queue)
+            return
+        self.show_scan_feedback(message, kind)
+
+    def calculate_antiguedad(self, f_servicio):
+        """Calcula la antigüedad en años y días desde la fecha de servicio."""
+        years, days, _ = seniority_of(f_servicio, self.seniority_as_of)
+        return years, days
 
     def is_experienced(self, f_servicio):
         """Determina si un empleado tiene experiencia (más de 90 días)."""
-        if pd.isna(f_servicio) or not isinstance(f_servicio, (datetime, pd.Timestamp)):
-            return False
+        return seniority_of(f_servicio, self.seniority_as_of)[2]
+
+    def add_scanned_employee(self, employee_id, emp_data, persist=True, session=None):
+        """Guarda un empleado escaneado en la sesión indicada (la activa por defecto) y lo suma a sus contadores."""
+        if session is None:
+            session = self.active_session
+        session.scanned_employees_data[employee_id] = emp_data
+        session.stats.add(emp_data)
+        self.employee_sessions[employee_id] = session
+        if persist and self.scan_store is not None:
+            # Solo encola la fila; el hilo escritor de ScanStore hace el commit por lotes
+            self.scan_store.record(self.session_key, employee_id, emp_data, session.line)
+
+    def switch_line(self, event=None):
+        """Cambia la línea activa: solo se intercambia la sesión que se muestra, no se recalcula nada."""
+        session = self._line_session(self.cb_lines.get())
+        if session is not self.active_session:
+            self.active_session = session
+            # Las ventanas de registros abiertas pasan a mostrar la sesión de la nueva línea
+            self.master.event_generate("<<ScanUpdate>>")
+        self.update_stats_labels()
 
-        today = datetime.now()
-        delta = today - f_servicio
-        return delta.days > 90
+    def _check_shift_rollover(self):
+        """Si empezó otro turno, cambia la clave de sesión y empieza sesiones de línea vacías."""
+        session_key = current_session_key()
+        if session_key == self.session_key:
+            return
+        print(f"Turno nuevo: sesión {session_key} (la sesión {self.session_key} queda guardada)")
+        self.session_key = session_key
+        line = self.active_session.line or self.lines[0]
+        self.line_sessions = {}
+        self.employee_sessions = {}
+        self.active_session = self._line_session(line)
+        # Las ventanas de registros abiertas pasan a mostrar la sesión vacía del turno nuevo
+        self.master.event_generate("<<ScanUpdate>>")
+
+    def _check_date_rollover(self):
+        """Si cambió el día, recalcula en bloque la antigüedad de la plantilla, de los escaneados y los contadores."""
+        today = seniority_as_of_today()
+        if today == self.seniority_as_of:
+            return
+        self.seniority_as_of = today
+        self.employee_index.refresh_seniority(today)
+
+        for session in self.line_sessions.values():
+            scanned = list(session.scanned_employees_data.values())
+            days = seniority_days([emp_data.f_servicio_day for emp_data in scanned], today).tolist()
+            session.stats = StatsAggregator()
+            for emp_data, dias in zip(scanned, days):
+                emp_data.Antiguedad_Dias = dias
+                session.stats.add(emp_data)
+        # Las ventanas de registros abiertas rehacen sus filas con la antigüedad nueva
+        self.master.event_generate("<<ScanUpdate>>")
+
+    def _set_label(self, label, value):
+        """Actualiza el texto de una etiqueta solo si su valor cambió."""
+        text = f"{value}"
+        if self._label_texts.get(label) != text:
+            label.config(text=text)
+            self._label_texts[label] = text
 
     def update_stats_labels(self, event=None):
         """Actualiza todas las etiquetas de estadísticas en la interfaz."""
-        total_unique_scanned = len(self.scanned_employees_data)
-        
-        self.lbl_total_empleados.config(text=f"{total_unique_scanned}")
-
-        total_mfgupo = sum(1 for emp_data in self.scanned_employees_data.values() if emp_data.get('POSITION', '').lower() == 'mfgupo')
-        total_qainsp = sum(1 for emp_data in self.scanned_employees_data.values() if emp_data.get('POSITION', '').lower() == 'qainsp')
+        # La experiencia (>90 días) depende de la fecha: si cambió el día se recalcula una vez
+        self._check_shift_rollover()
+        self._check_date_rollover()
+        stats = self.stats
 
-        self.lbl_total_mfgupo.config(text=f"{total_mfgupo}")
-        self.lbl_total_qainsp.config(text=f"{total_qainsp}")
-
-        total_experienced = 0
-        total_inexperienced = 0
-        for emp_data in self.scanned_employees_data.values():
-            if self.is_experienced(emp_data['F_Servicio']):
-                total_experienced += 1
-            else:
-                total_inexperienced += 1
-        self.lbl_total_experiencia.config(text=f"{total_experienced}")
-        self.lbl_total_sin_experiencia.config(text=f"{total_inexperienced}")
+        self._set_label(self.lbl_total_empleados, stats.total)
+        self._set_label(self.lbl_total_mfgupo, stats.mfgupo)
+        self._set_label(self.lbl_total_qainsp, stats.qainsp)
+        self._set_label(self.lbl_total_experiencia, stats.experienced)
+        self._set_label(self.lbl_total_sin_experiencia, stats.inexperienced)
 
         # Obtener la línea seleccionada del Combobox
-        selected_line = self.cb_lines.get()
-        total_not_in_selected_line = 0
-        if selected_line:
-            total_not_in_selected_line = sum(1 for emp_data in self.scanned_employees_data.values() if emp_data.get('Linea', '').lower() != selected_line.lower())
-        self.lbl_no_linea_seleccionada.config(text=f"{total_not_in_selected_line}")
+        self._set_label(self.lbl_no_linea_seleccionada, stats.not_in_line(self.cb_lines.get()))
 
         # Actualizar las etiquetas de programación en la sección horizontal
-        self.lbl_programado_operadores.config(text=f"{self.programmed_total_operadores}")
-        self.lbl_programado_soportes.config(text=f"{self.programmed_total_soportes}")
-        self.lbl_programado_calidad.config(text=f"{self.programmed_total_calidad}")
+        self._set_label(self.lbl_programado_operadores, self.programmed_total_operadores)
+        self._set_label(self.lbl_programado_soportes, self.programmed_total_soportes)
+        self._set_label(self.lbl_programado_calidad, self.programmed_total_calidad)
 
         self.programmed_total_employees = (
             self.programmed_total_operadores +
             self.programmed_total_soportes +
             self.programmed_total_calidad
         )
-        self.lbl_programado_total.config(text=f"{self.programmed_total_employees}")
+        self._set_label(self.lbl_programado_total, self.programmed_total_employees)
 
-        difference = total_unique_scanned - self.programmed_total_employees
-        self.lbl_diferencia.config(text=f"{difference}")
+        difference = stats.total - self.programmed_total_employees
+        self._set_label(self.lbl_diferencia, difference)
+
+        if MULTI_LINE_SESSIONS:
+            open_sessions = [f"{session.line} ({session.stats.total}/{session.programmed_total_employees})"
+                             for session in self.line_sessions.values()
+                             if session.stats.total or session.programmed_total_employees or session is self.active_session]
+            self._set_label(self.lbl_line_sessions, "Sesiones (registrado/programado): " + ", ".join(open_sessions))
 
 
     def open_programming_window(self):
@@ -410,11 +1361,20 @@ class App:
         """Abre la ventana para ver los empleados registrados."""
         EmployeeViewWindow(self.master, self.scanned_employees_data, self)
 
+    def open_diagnostics_window(self):
+        """Abre (o trae al frente) la ventana de diagnóstico de tiempos de escaneo."""
+        window = self._diagnostics_window
+        if window is not None and window.winfo_exists():
+            window.lift()
+            return
+        self._diagnostics_window = DiagnosticsWindow(self.master, self)
+
 
 class ProgrammingWindow(tk.Toplevel):
     def __init__(self, master, app_instance):
         super().__init__(master)
-        self.title("Programar Personal")
+        line = app_instance.active_session.line
+        self.title(f"Programar Personal - Línea {line}" if line else "Programar Personal")
         self.geometry("380x250") # **Tamaño optimizado para un ajuste perfecto y visibilidad**
         self.resizable(False, False)
         self.app_instance = app_instance
@@ -501,6 +1461,38 @@ class ProgrammingWindow(tk.Toplevel):
         finally:
             self.app_instance.txt_escaneo.focus_set()
 
+class DiagnosticsWindow(tk.Toplevel):
+    """Ventana oculta (Ctrl+Shift+D) con p50/p95/p99 por etapa y escaneos por minuto."""
+    def __init__(self, master, app_instance):
+        super().__init__(master)
+        self.title("Diagnóstico de Escaneo")
+        self.geometry("560x220")
+        self.app_instance = app_instance
+        self.configure(bg="#F0F2F5")
+
+        self.lbl_summary = tk.Label(self, font=("Courier New", 10), justify="left", anchor="nw", background="#FFFFFF", padx=10, pady=10)
+        self.lbl_summary.pack(fill=tk.BOTH, expand=True, padx=10, pady=(10, 5))
+
+        button_frame = ttk.Frame(self)
+        button_frame.pack(fill=tk.X, padx=10, pady=(0, 10))
+        ttk.Button(button_frame, text="Escribir en Log", command=self.app_instance.metrics.log_summary).pack(side=tk.RIGHT)
+
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        self._refresh_after_id = None
+        self.refresh()
+
+    def refresh(self):
+        """Actualiza el resumen y se vuelve a programar mientras la ventana esté abierta."""
+        self.lbl_summary.config(text="\n".join(self.app_instance.metrics.summary_lines()))
+        self._refresh_after_id = self.after(DIAGNOSTICS_REFRESH_MS, self.refresh)
+
+    def on_close(self):
+        if self._refresh_after_id is not None:
+            self.after_cancel(self._refresh_after_id)
+        self.app_instance.txt_escaneo.focus_set()
+        self.destroy()
+
+
 class EmployeeViewWindow(tk.Toplevel):
     def __init__(self, master, scanned_data, app_instance):
         super().__init__(master)
@@ -515,6 +1507,24 @@ class EmployeeViewWindow(tk.Toplevel):
         # 6. Color de fondo de la ventana EmployeeViewWindow (Root de esta ventana)
         self.configure(bg="#F0F2F5") # Fondo para toda la ventana de vista de empleados
 
+        # Filas ya formateadas por empleado (válidas para la fecha _rows_as_of) y, por pestaña, ID de empleado -> item del Treeview
+        self._rows = {}
+        self._rows_as_of = app_instance.seniority_as_of
+        self._tree_items = {}
+        # Por pestaña: IDs que le pertenecen en orden (None = aún no construida) y cargas pendientes (id de after_idle)
+        self._tab_ids = {}
+        self._load_more_pending = {}
+
+        # Redimensionado: ajuste pendiente (after_idle) y último ancho aplicado por pestaña
+        self._resize_after_id = None
+        self._tree_widths = {}
+        self._rendered_count = 0 # Cuántos registros de scanned_employees_data ya se procesaron
+
+        # Última búsqueda aplicada y los IDs que coincidieron (en orden de registro)
+        self._search_after_id = None
+        self._last_search = None
+        self._last_matches = []
+
         self.create_widgets()
         self.update_tables()
 
@@ -523,7 +1533,7 @@ class EmployeeViewWindow(tk.Toplevel):
         self.bind("<Configure>", self.on_resize)
 
         # Usar un callback lambda para pasar el evento directamente a update_tables_event
-        self.app_instance.master.bind("<<ScanUpdate>>", lambda event: self.update_tables_event())
+        self._scan_update_binding = self.app_instance.master.bind("<<ScanUpdate>>", lambda event: self.update_tables_event())
 
 
     def create_widgets(self):
@@ -541,13 +1551,13 @@ class EmployeeViewWindow(tk.Toplevel):
         ttk.Label(search_frame, text="Buscar Empleado (ID o Nombre):", font=("Arial", 12, "bold"), background="#F0F2F5").pack(side=tk.LEFT, padx=5)
         self.search_entry = ttk.Entry(search_frame, width=50, font=("Arial", 12)) 
         self.search_entry.pack(side=tk.LEFT, padx=10, fill=tk.X, expand=True)
-        self.search_entry.bind("<KeyRelease>", self.filter_tables)
+        self.search_entry.bind("<KeyRelease>", self._on_search_key)
 
         self.notebook = ttk.Notebook(main_frame)
         self.notebook.pack(fill=tk.BOTH, expand=True, pady=15) 
 
         self.tabs = {}
-        tab_names = ["Todos", "Op. con Experiencia", "Op. sin Experiencia", "Soportes", "Calidad", "Op. Prestados"]
+        self.tab_names = TAB_NAMES
 
         # 8. Colores de fondo de las pestañas (Notebook)
         style = ttk.Style() # Re-obtener el estilo para esta ventana si es necesario
@@ -555,18 +1565,27 @@ class EmployeeViewWindow(tk.Toplevel):
         style.configure("TNotebook.Tab", background="#DCE3EE", foreground="#555", padding=[10, 5]) # Fondo y texto de pestañas no seleccionadas
         style.map("TNotebook.Tab", background=[("selected", "#FFFFFF")], foreground=[("selected", "#333")]) # Fondo y texto de pestaña seleccionada
 
-        for name in tab_names:
+        for name in self.tab_names:
             frame = ttk.Frame(self.notebook, padding="10")
             self.notebook.add(frame, text=name)
             # 9. Fondo de los frames dentro de cada pestaña del Notebook
             # Estos frames son los contenedores de las tablas. Su fondo se verá alrededor de la tabla si no la cubre por completo.
             frame.configure(background="#FFFFFF") # Un fondo blanco para el contenido de cada pestaña
-            self.tabs[name] = self.create_employee_table(frame)
+            self.tabs[name] = self.create_employee_table(frame, name)
+            self._tab_ids[name] = None
 
-        self.selected_line_for_tab = self.app_instance.cb_lines.get() if self.app_instance.cb_lines.get() else None
+        self._set_selected_line()
 
+        # Cada pestaña se construye la primera vez que se selecciona
+        self.notebook.bind("<<NotebookTabChanged>>", self._on_tab_changed)
 
-    def create_employee_table(self, parent_frame):
+
+    def _set_selected_line(self):
+        """Toma la línea activa de la ventana principal (y su código) para la pestaña 'Op. Prestados'."""
+        self.selected_line_for_tab = self.app_instance.cb_lines.get() if self.app_instance.cb_lines.get() else None
+        self.selected_line_code = LINE_CODES.code(self.selected_line_for_tab) if self.selected_line_for_tab else None
+
+    def create_employee_table(self, parent_frame, tab_name):
         """Crea una tabla Treeview para mostrar datos de empleados."""
         # 10. Fondo del frame que contiene la tabla (si la tabla no ocupa todo el espacio)
         table_frame = ttk.Frame(parent_frame, background="#FFFFFF") # Fondo blanco para este frame
@@ -584,11 +1603,12 @@ class EmployeeViewWindow(tk.Toplevel):
         tree.column("Nombre", width=280, minwidth=200, stretch=tk.YES) 
         tree.column("Línea", width=80, minwidth=60, stretch=tk.NO)
         tree.column("Puesto", width=120, minwidth=100, stretch=tk.NO)
-        tree.column("Antiguedad", width=180, minwidth=150, stretch=tk.NO)
+        tree.column("Antigüedad", width=180, minwidth=150, stretch=tk.NO)
         tree.column("Experiencia", width=100, minwidth=80, stretch=tk.NO)
 
         scrollbar_y = ttk.Scrollbar(table_frame, orient="vertical", command=tree.yview)
-        tree.configure(yscrollcommand=scrollbar_y.set)
+        # Además de mover la barra, el scroll decide cuándo materializar la siguiente página
+        tree.configure(yscrollcommand=lambda first, last: self._on_tree_scroll(tab_name, scrollbar_y, first, last))
 
         scrollbar_x = ttk.Scrollbar(table_frame, orient="horizontal", command=tree.xview)
         tree.configure(xscrollcommand=scrollbar_x.set)
@@ -602,125 +1622,247 @@ class EmployeeViewWindow(tk.Toplevel):
 
     def update_tables_event(self):
         """Evento para actualizar tablas (usado por el bind de la ventana principal)."""
-        self.update_tables()
+        if self._rows_as_of != self.app_instance.seniority_as_of:
+            # Cambió el día: la antigüedad y la experiencia de las filas ya preparadas quedaron viejas
+            self._rows.clear()
+            self._rows_as_of = self.app_instance.seniority_as_of
+            self.scanned_employees_data = self.app_instance.scanned_employees_data
+            self._set_selected_line()
+            self.update_tables()
+            return
+        if self.scanned_employees_data is not self.app_instance.scanned_employees_data:
+            # Se cambió de línea en la ventana principal: mostrar la sesión de la nueva línea
+            self.scanned_employees_data = self.app_instance.scanned_employees_data
+            self._set_selected_line()
+            self.update_tables()
+            return
+        if len(self.scanned_employees_data) < self._rendered_count:
+            # Los datos se reemplazaron (no solo crecieron): reconstruir todo
+            self.update_tables()
+            return
+        self.append_new_rows()
 
     def update_tables(self):
-        """Actualiza todas las tablas Treeview con los datos actuales."""
-        # ... (código existente para llenar las tablas) ...
-        # Aquí continúa tu código para update_tables y on_close, etc.
-        # Solo puse un ejemplo del inicio del método update_tables().
-        
-        # Para que el código sea ejecutable, necesitas el resto de los métodos y la ejecución del mainloop.
-        # No los incluí completos aquí para enfocarme en los cambios de color.
-        # Asegúrate de copiar solo las líneas modificadas o el código completo actualizado.
-        
-        # Ejemplo para limpiar y rellenar una tabla (dentro de update_tables):
-        for tree in self.tabs.values():
-            for item in tree.get_children():
-                tree.delete(item)
-        
-        # Luego, rellenas las tablas según la lógica de tu aplicación
-        # Por ejemplo, para la pestaña "Todos":
-        all_employees_tree = self.tabs["Todos"]
-        for employee_id, data in self.scanned_employees_data.items():
-            antiguedad_str = f"{data['Antiguedad_Anos']:.1f} años ({data['Antiguedad_Dias']} días)"
-            experiencia_str = "Sí" if self.app_instance.is_experienced(data['F_Servicio']) else "No"
-            all_employees_tree.insert("", tk.END, values=(
-                employee_id,
-                data['Nombre'],
-                data['Linea'],
-                data['Puesto'],
-                antiguedad_str,
-                experiencia_str
-            ))
-
-        self.filter_tables() # Vuelve a aplicar el filtro de búsqueda después de actualizar los datos
+        """Actualiza todas las tablas Treeview con los datos actuales (reconstrucción completa)."""
+        self.filter_tables()
+
+    def _build_row(self, employee_id, data):
+        """Prepara (una sola vez por empleado) los valores que se muestran y se filtran."""
+        experienced = data['Experiencia']
+        return {
+            'ID Empleado': employee_id,
+            'Nombre': data['Nombre'],
+            'Línea': data['Linea'],
+            'Puesto': data['Puesto'],
+            'Antigüedad_Anos': data['Antiguedad_Anos'],
+            'Antiguedad_Dias': data['Antiguedad_Dias'],
+            'Experiencia_Bool': experienced,
+            'POSITION': data['POSITION'],
+            # Códigos categóricos (ScannedEmployee) para filtrar las pestañas comparando enteros
+            'Position_Code': data.position_code,
+            'Puesto_Code': data.puesto_code,
+            'Linea_Code': data.linea_code,
+            'Antiguedad_Str': f"{data['Antiguedad_Anos']:.1f} años ({data['Antiguedad_Dias']} días)",
+            'Experiencia_Str': "Sí" if experienced else "No",
+            # Texto en minúsculas contra el que se busca (ID y nombre; el salto de línea evita coincidencias entre ambos)
+            'Search_Key': f"{employee_id}\n{data['Nombre']}".lower()
+        }
+
+    def _row_for(self, employee_id):
+        """Devuelve la fila preparada de un empleado (usando la caché)."""
+        emp = self._rows.get(employee_id)
+        if emp is None:
+            emp = self._build_row(employee_id, self.scanned_employees_data[employee_id])
+            self._rows[employee_id] = emp
+        return emp
+
+    def _belongs_to_tab(self, tab_name, emp):
+        """Indica si un empleado se muestra en la pestaña dada (sin considerar la búsqueda)."""
+        return belongs_to_tab(tab_name, emp['Position_Code'], emp['Puesto_Code'], emp['Linea_Code'], emp['Experiencia_Bool'], self.selected_line_code)
+
+    @staticmethod
+    def _matches_search(emp, search_term):
+        """Indica si el ID o el nombre del empleado contienen el texto buscado."""
+        return search_term in emp['Search_Key']
+
+    def _on_search_key(self, event=None):
+        """Reprograma la búsqueda para cuando el usuario deje de teclear."""
+        if self._search_after_id is not None:
+            self.after_cancel(self._search_after_id)
+        self._search_after_id = self.after(SEARCH_DEBOUNCE_MS, self._apply_search)
+
+    def _apply_search(self):
+        """Aplica el texto de búsqueda actual a las tablas."""
+        self._search_after_id = None
+        search_term = self.search_entry.get().lower()
+        if search_term == self._last_search:
+            return
 
+        if self._last_search is not None and search_term.startswith(self._last_search):
+            # La búsqueda solo se extendió: basta con filtrar los resultados anteriores y
+            # quitar de las tablas las filas que dejaron de coincidir
+            matches = [eid for eid in self._last_matches if search_term in self._rows[eid]['Search_Key']]
+            still_visible = set(matches)
+            for tab_name, tree in self.tabs.items():
+                if self._tab_ids[tab_name] is None:
+                    continue # Pestaña todavía no construida: se armará al seleccionarla
+                self._tab_ids[tab_name] = [eid for eid in self._tab_ids[tab_name] if eid in still_visible]
+                items = self._tree_items[tab_name]
+                removed = [eid for eid in items if eid not in still_visible]
+                if removed:
+                    tree.delete(*(items.pop(eid) for eid in removed))
+                self._fill_tab(tab_name, VIRTUAL_PAGE_SIZE)
+            self._last_search = search_term
+            self._last_matches = matches
+        else:
+            self.filter_tables()
+
+    def _insert_row(self, tab_name, emp):
+        """Inserta un empleado al final de una pestaña y recuerda el item creado."""
+        item_id = self.tabs[tab_name].insert("", tk.END, values=(emp['ID Empleado'], emp['Nombre'], emp['Línea'], emp['Puesto'], emp['Antiguedad_Str'], emp['Experiencia_Str']))
+        self._tree_items[tab_name][emp['ID Empleado']] = item_id
+
+    def _current_tab(self):
+        """Nombre de la pestaña seleccionada en el Notebook."""
+        return self.tab_names[self.notebook.index("current")]
+
+    def _build_tab(self, tab_name):
+        """Calcula qué empleados pertenecen a la pestaña y materializa solo la primera página."""
+        tree = self.tabs[tab_name]
+        tree.delete(*tree.get_children())
+        self._tree_items[tab_name] = {}
+        self._tab_ids[tab_name] = [eid for eid in self._last_matches if self._belongs_to_tab(tab_name, self._rows[eid])]
+        self._fill_tab(tab_name, VIRTUAL_PAGE_SIZE)
+
+    def _fill_tab(self, tab_name, target):
+        """Materializa filas de la pestaña (en orden) hasta tener 'target' en el Treeview."""
+        ids = self._tab_ids[tab_name]
+        if ids is None:
+            return
+        items = self._tree_items[tab_name]
+        for employee_id in ids[len(items):target]:
+            self._insert_row(tab_name, self._rows[employee_id])
+
+    def _load_more(self, tab_name):
+        """Inserta en el Treeview la siguiente página de filas de la pestaña."""
+        self._load_more_pending.pop(tab_name, None)
+        self._fill_tab(tab_name, len(self._tree_items[tab_name]) + VIRTUAL_PAGE_SIZE)
+
+    def _on_tree_scroll(self, tab_name, scrollbar, first, last):
+        """yscrollcommand de cada tabla: al acercarse al final se cargan más filas."""
+        scrollbar.set(first, last)
+        ids = self._tab_ids.get(tab_name)
+        if ids is None or len(self._tree_items[tab_name]) >= len(ids):
+            return
+        if float(last) >= VIRTUAL_PRELOAD_FRACTION and tab_name not in self._load_more_pending:
+            # No insertar dentro del callback de scroll; hacerlo cuando Tk quede libre
+            self._load_more_pending[tab_name] = self.after_idle(self._load_more, tab_name)
+
+    def _on_tab_changed(self, event=None):
+        """Construye la pestaña seleccionada la primera vez que se muestra y ajusta sus columnas."""
+        tab_name = self._current_tab()
+        if self._tab_ids[tab_name] is None:
+            self._build_tab(tab_name)
+        # Las pestañas ocultas no se ajustan al redimensionar; se ponen al día al mostrarse
+        if self._resize_after_id is None:
+            self._resize_after_id = self.after_idle(self._apply_resize)
+
+    def append_new_rows(self):
+        """Agrega solo los empleados registrados desde la última actualización, en las pestañas que les corresponden."""
+        # Se usa la búsqueda ya aplicada (no el texto que se está tecleando todavía)
+        search_term = self._last_search or ""
+        new_ids = list(islice(self.scanned_employees_data, self._rendered_count, None))
+        for employee_id in new_ids:
+            emp = self._row_for(employee_id)
+            if not self._matches_search(emp, search_term):
+                continue
+            self._last_matches.append(employee_id)
+            for tab_name in self.tabs:
+                ids = self._tab_ids[tab_name]
+                if ids is None or not self._belongs_to_tab(tab_name, emp):
+                    continue
+                ids.append(employee_id)
+                # Si la tabla ya muestra todas las filas anteriores, la nueva va al final;
+                # si no, se materializará cuando el usuario se desplace hasta ella
+                if len(self._tree_items[tab_name]) == len(ids) - 1:
+                    self._insert_row(tab_name, emp)
+        self._rendered_count += len(new_ids)
 
     def filter_tables(self, event=None):
-        """Filtra las tablas Treeview basándose en el texto de búsqueda."""
+        """Filtra las tablas Treeview basándose en el texto de búsqueda (reconstrucción completa)."""
         search_term = self.search_entry.get().lower()
 
-        employee_data_list = []
-        for employee_id, data in self.scanned_employees_data.items():
-            antiguedad_str = f"{data['Antiguedad_Anos']:.1f} años ({data['Antiguedad_Dias']} días)"
-            experiencia_str = "Sí" if self.app_instance.is_experienced(data['F_Servicio']) else "No"
-            employee_data_list.append({
-                'ID Empleado': employee_id,
-                'Nombre': data['Nombre'],
-                'Línea': data['Linea'],
-                'Puesto': data['Puesto'],
-                'Antigüedad_Anos': data['Antiguedad_Anos'],
-                'Antiguedad_Dias': data['Antiguedad_Dias'],
-                'Experiencia_Bool': self.app_instance.is_experienced(data['F_Servicio']),
-                'POSITION': data['POSITION'],
-                'Antiguedad_Str': antiguedad_str,
-                'Experiencia_Str': experiencia_str
-            })
+        matches = [employee_id for employee_id in self.scanned_employees_data if search_term in self._row_for(employee_id)['Search_Key']]
+        self._rendered_count = len(self.scanned_employees_data)
+        self._last_search = search_term
+        self._last_matches = matches
 
+        # Las pestañas se construyen de forma perezosa: solo la visible se arma ahora
         for tab_name, tree in self.tabs.items():
-            # Clear existing items
-            for item in tree.get_children():
-                tree.delete(item)
-
-            filtered_data = []
-            for emp in employee_data_list:
-                match_search = search_term in emp['ID Empleado'].lower() or search_term in emp['Nombre'].lower()
-
-                if tab_name == "Todos":
-                    if match_search:
-                        filtered_data.append(emp)
-                elif tab_name == "Op. con Experiencia":
-                    if match_search and emp['POSITION'].lower() == 'mfgupo' and emp['Experiencia_Bool']:
-                        filtered_data.append(emp)
-                elif tab_name == "Op. sin Experiencia":
-                    if match_search and emp['POSITION'].lower() == 'mfgupo' and not emp['Experiencia_Bool']:
-                        filtered_data.append(emp)
-                elif tab_name == "Soportes":
-                    if match_search and emp['POSITION'].lower() == 'mfgupo' and emp['Puesto'].lower() == 'mfgsup': # Asumiendo 'mfgsup' para soportes
-                         filtered_data.append(emp)
-                elif tab_name == "Calidad":
-                    if match_search and emp['POSITION'].lower() == 'qainsp':
-                        filtered_data.append(emp)
-                elif tab_name == "Op. Prestados":
-                    if match_search and emp['POSITION'].lower() == 'mfgupo' and emp['Línea'].lower() != self.selected_line_for_tab.lower():
-                        filtered_data.append(emp)
-
-            for emp in filtered_data:
-                tree.insert("", tk.END, values=(emp['ID Empleado'], emp['Nombre'], emp['Línea'], emp['Puesto'], emp['Antiguedad_Str'], emp['Experiencia_Str']))
+            tree.delete(*tree.get_children())
+            self._tree_items[tab_name] = {}
+            self._tab_ids[tab_name] = None
+        self._build_tab(self._current_tab())
 
     def on_close(self):
         """Maneja el cierre de la ventana secundaria."""
+        self.app_instance.master.unbind("<<ScanUpdate>>", self._scan_update_binding)
+        # Una búsqueda pendiente (debounce) no debe ejecutarse sobre widgets ya destruidos
+        if self._search_after_id is not None:
+            self.after_cancel(self._search_after_id)
+            self._search_after_id = None
+        # Igual con el ajuste de columnas y las páginas que quedaron por cargar
+        if self._resize_after_id is not None:
+            self.after_cancel(self._resize_after_id)
+            self._resize_after_id = None
+        for after_id in self._load_more_pending.values():
+            self.after_cancel(after_id)
+        self._load_more_pending.clear()
         self.app_instance.txt_escaneo.focus_set() # Regresar el foco al campo de escaneo
         self.destroy()
 
     def on_resize(self, event):
-        """Ajusta el ancho de las columnas del Treeview cuando la ventana se redimensiona."""
-        # Se activa cuando la ventana cambia de tamaño
-        for tab_name, tree in self.tabs.items():
-            # Obtener el ancho actual del Treeview
-            total_width = tree.winfo_width()
-            
-            # Anchos fijos (para columnas que no deben estirarse)
-            id_width = 100
-            line_width = 80
-            puesto_width = 120
-            antiguedad_width = 180
-            experiencia_width = 100
-            
-            # Ancho disponible para la columna de Nombre (que debe estirarse)
-            remaining_width = total_width - (id_width + line_width + puesto_width + antiguedad_width + experiencia_width + 50) # El 50 es un ajuste para el scrollbar y padding
-            
-            # Asegurarse de que el ancho no sea negativo
-            if remaining_width < 100: # Mínimo para Nombre
-                remaining_width = 100
-            
-            tree.column("ID Empleado", width=id_width, minwidth=id_width)
-            tree.column("Nombre", width=remaining_width, minwidth=100)
-            tree.column("Línea", width=line_width, minwidth=line_width)
-            tree.column("Puesto", width=puesto_width, minwidth=puesto_width)
-            tree.column("Antigüedad", width=antiguedad_width, minwidth=antiguedad_width)
-            tree.column("Experiencia", width=experiencia_width, minwidth=experiencia_width)
+        """Programa el ajuste de columnas; varios <Configure> seguidos se atienden en una sola pasada."""
+        # El bind del Toplevel también recibe los <Configure> de todos sus widgets hijos
+        if event.widget is not self:
+            return
+        if self._resize_after_id is None:
+            self._resize_after_id = self.after_idle(self._apply_resize)
+
+    def _apply_resize(self):
+        """Ajusta el ancho de las columnas de la pestaña visible (si su ancho cambió)."""
+        self._resize_after_id = None
+        self._resize_columns(self._current_tab())
+
+    def _resize_columns(self, tab_name):
+        """Ajusta el ancho de las columnas del Treeview de una pestaña a su ancho actual."""
+        tree = self.tabs[tab_name]
+        # Obtener el ancho actual del Treeview
+        total_width = tree.winfo_width()
+        if self._tree_widths.get(tab_name) == total_width:
+            return # Mismo ancho que la última vez: no hay nada que recalcular
+        self._tree_widths[tab_name] = total_width
+
+        # Anchos fijos (para columnas que no deben estirarse)
+        id_width = 100
+        line_width = 80
+        puesto_width = 120
+        antiguedad_width = 180
+        experiencia_width = 100
+        
+        # Ancho disponible para la columna de Nombre (que debe estirarse)
+        remaining_width = total_width - (id_width + line_width + puesto_width + antiguedad_width + experiencia_width + 50) # El 50 es un ajuste para el scrollbar y padding
+        
+        # Asegurarse de que el ancho no sea negativo
+        if remaining_width < 100: # Mínimo para Nombre
+            remaining_width = 100
+        
+        tree.column("ID Empleado", width=id_width, minwidth=id_width)
+        tree.column("Nombre", width=remaining_width, minwidth=100)
+        tree.column("Línea", width=line_width, minwidth=line_width)
+        tree.column("Puesto", width=puesto_width, minwidth=puesto_width)
+        tree.column("Antigüedad", width=antiguedad_width, minwidth=antiguedad_width)
+        tree.column("Experiencia", width=experiencia_width, minwidth=experiencia_width)
 
 
 
@@ -0,0 +1,239 @@
+"""
+Benchmark de la interfaz (App y EmployeeViewWindow) sin pantalla.
+
+Genera plantillas HDC sintéticas del tamaño indicado (1k a 200k filas) con
+distribuciones realistas de LINEA, POSITION y F Servicio, y mide con Tk real
+las operaciones que más pesan en los kioscos:
+
+    - construcción del índice de la plantilla
+    - App.process_scan (por escaneo, incluyendo el after_idle que lo registra)
+    - App.update_stats_labels
+    - apertura de EmployeeViewWindow, update_tables, filter_tables y el
+      refresco incremental tras nuevos escaneos (update_tables_event)
+
+Por operación reporta tiempo medio, p50, p95 y el pico de memoria asignada
+(tracemalloc, en una corrida aparte para no alterar los tiempos). Con --json se
+guardan los resultados; con --base se comparan contra una corrida anterior y el
+proceso termina con código 1 si alguna operación empeoró más que la tolerancia.
+
+En Linux sin $DISPLAY se relanza solo dentro de xvfb-run (si está instalado).
+La ventana principal no se oculta (withdraw): EmployeeViewWindow es transient de
+ella y Tk ocultaría también la ventana de empleados, con lo que grab_set falla.
+
+Uso:
+    python benchmarks/bench_app_headless.py
+    python benchmarks/bench_app_headless.py --filas 1000 10000 200000 --json base.json
+    python benchmarks/bench_app_headless.py --base base.json --tolerancia 1.5
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import tkinter as tk
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from app_empleados import App, EmployeeIndex, EmployeeViewWindow, seniority_as_of_today  # noqa: E402
+from plantilla_sintetica import generar_plantilla  # noqa: E402
+
+TAMANOS = [1_000, 10_000, 50_000, 200_000]
+ESCANEOS = 500
+MAX_ESCANEADOS = 20_000
+REPETICIONES = 5
+
+BUSQUEDAS = ["f37", "empleado 1", "mfgupo", "zzz", ""]
+
+
+class BenchApp(App):
+    """App sin la carga de hdc.xlsx en segundo plano: la plantilla sintética se instala directamente."""
+
+    def start_roster_load(self):
+        pass
+
+
+def medir(func, repeticiones):
+    """Ejecuta `func` varias veces y devuelve las latencias en milisegundos."""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        func()
+        tiempos.append((time.perf_counter() - inicio) * 1e3)
+    return tiempos
+
+
+def pico_memoria(func):
+    """Pico de memoria asignada (KB) durante una ejecución de `func`."""
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        func()
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def resultado(filas, operacion, tiempos, memoria_kb):
+    return {
+        'filas': filas,
+        'operacion': operacion,
+        'n': len(tiempos),
+        'media_ms': float(np.mean(tiempos)),
+        'p50_ms': float(np.percentile(tiempos, 50)),
+        'p95_ms': float(np.percentile(tiempos, 95)),
+        'pico_kb': memoria_kb,
+    }
+
+
+def bench_tamano(n, escaneos):
+    """Corre todas las operaciones contra una plantilla de `n` filas (con su propia ventana Tk)."""
+    resultados = []
+    df = generar_plantilla(n, seed=n)
+    as_of = seniority_as_of_today()
+    rng = np.random.default_rng(n + 1)
+
+    tiempos = medir(lambda: EmployeeIndex(df, as_of), 3)
+    resultados.append(resultado(n, 'indice', tiempos, pico_memoria(lambda: EmployeeIndex(df, as_of))))
+
+    root = tk.Tk()
+    app = BenchApp(root)
+    app._on_roster_loaded(df, EmployeeIndex(df, as_of), False, None)
+    root.update()
+
+    # Escaneos uno a uno, como llegan del lector: <Return> + el after_idle que los registra
+    ids = iter(df['Empleado'].to_numpy()[rng.permutation(n)].tolist())
+
+    def escanear():
+        app.txt_escaneo.insert(0, next(ids))
+        app.process_scan()
+        root.update_idletasks()
+
+    cantidad = min(escaneos, n // 2)
+    tiempos = medir(escanear, cantidad)
+    memoria = pico_memoria(lambda: [escanear() for _ in range(min(50, n // 4))])
+    resultados.append(resultado(n, 'process_scan', tiempos, memoria))
+
+    tiempos = medir(app.update_stats_labels, 200)
+    resultados.append(resultado(n, 'update_stats_labels', tiempos, pico_memoria(app.update_stats_labels)))
+
+    # Completar la sesión con un lote para que las tablas tengan volumen realista
+    resto = [next(ids) for _ in range(max(0, min(MAX_ESCANEADOS, n // 2) - len(app.scanned_employees_data)))]
+    tiempos = medir(lambda: app.bulk_register(resto), 1)
+    resultados.append(resultado(n, 'bulk_register', tiempos, None))
+
+    def abrir_ventana():
+        window = EmployeeViewWindow(root, app.scanned_employees_data, app)
+        root.update_idletasks()
+        window.on_close()
+
+    tiempos = medir(abrir_ventana, 3)
+    resultados.append(resultado(n, 'EmployeeViewWindow', tiempos, pico_memoria(abrir_ventana)))
+
+    window = EmployeeViewWindow(root, app.scanned_employees_data, app)
+    root.update()
+
+    tiempos = medir(window.update_tables, REPETICIONES)
+    resultados.append(resultado(n, 'update_tables', tiempos, pico_memoria(window.update_tables)))
+
+    def filtrar():
+        for termino in BUSQUEDAS:
+            window.search_entry.delete(0, tk.END)
+            window.search_entry.insert(0, termino)
+            window.filter_tables()
+
+    tiempos = [t / len(BUSQUEDAS) for t in medir(filtrar, REPETICIONES)]
+    resultados.append(resultado(n, 'filter_tables', tiempos, pico_memoria(filtrar)))
+
+    # Refresco incremental: llegan escaneos con la ventana abierta
+    def escanear_con_ventana():
+        app.handle_scan(next(ids))
+        root.update_idletasks()
+
+    tiempos = medir(escanear_con_ventana, min(100, n // 4))
+    resultados.append(resultado(n, 'update_tables_event', tiempos, pico_memoria(escanear_con_ventana)))
+
+    window.on_close()
+    app.on_close() # Vacía la cola de SQLite y destruye la ventana principal
+    return resultados
+
+
+def imprimir(resultados, base=None):
+    print(f"{'FILAS':>8}  {'OPERACION':<28}{'N':>5}{'MEDIA ms':>11}{'P50 ms':>10}{'P95 ms':>10}{'PICO KB':>11}{'VS BASE':>9}")
+    for r in resultados:
+        ratio = ""
+        if base is not None and (r['filas'], r['operacion']) in base:
+            ratio = f"{r['p50_ms'] / max(base[(r['filas'], r['operacion'])]['p50_ms'], 1e-6):.2f}x"
+        pico = "-" if r['pico_kb'] is None else f"{r['pico_kb']:.1f}"
+        print(f"{r['filas']:>8}  {r['operacion']:<28}{r['n']:>5}{r['media_ms']:>11.3f}{r['p50_ms']:>10.3f}{r['p95_ms']:>10.3f}{pico:>11}{ratio:>9}")
+
+
+def relanzar_en_xvfb():
+    """Sin pantalla en Linux: vuelve a ejecutar el script dentro de xvfb-run, si existe."""
+    if sys.platform.startswith('linux') and not os.environ.get('DISPLAY') and not os.environ.get('BENCH_XVFB'):
+        xvfb_run = shutil.which('xvfb-run')
+        if xvfb_run is None:
+            sys.exit("No hay $DISPLAY ni xvfb-run: instale Xvfb (xvfb-run) o ejecute con una pantalla.")
+        env = dict(os.environ, BENCH_XVFB='1')
+        sys.exit(subprocess.call([xvfb_run, '-a', sys.executable] + sys.argv, env=env))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--filas', type=int, nargs='+', default=TAMANOS, help="tamaños de plantilla a medir")
+    parser.add_argument('--escaneos', type=int, default=ESCANEOS, help="escaneos individuales por tamaño")
+    parser.add_argument('--json', help="guardar los resultados en este archivo")
+    parser.add_argument('--base', help="resultados anteriores (--json) contra los que comparar")
+    parser.add_argument('--tolerancia', type=float, default=1.5, help="empeoramiento máximo del p50 aceptado frente a la base")
+    args = parser.parse_args()
+
+    relanzar_en_xvfb()
+
+    base = None
+    if args.base:
+        with open(args.base, encoding='utf-8') as f:
+            base = {(r['filas'], r['operacion']): r for r in json.load(f)}
+    salida = os.path.abspath(args.json) if args.json else None
+
+    # Base de datos y log de métricas de la app quedan en un directorio temporal
+    inicio = os.getcwd()
+    trabajo = tempfile.mkdtemp(prefix='bench_app_')
+    os.chdir(trabajo)
+    resultados = []
+    try:
+        for n in args.filas:
+            # Un directorio por tamaño: la sesión guardada de una corrida no se recupera en la siguiente
+            os.makedirs(os.path.join(trabajo, str(n)))
+            os.chdir(os.path.join(trabajo, str(n)))
+            resultados.extend(bench_tamano(n, args.escaneos))
+    finally:
+        os.chdir(inicio)
+        shutil.rmtree(trabajo, ignore_errors=True)
+
+    imprimir(resultados, base)
+
+    try:
+        import resource
+        print(f"\nMemoria máxima del proceso (RSS): {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MB")
+    except ImportError:
+        pass # resource no existe en Windows
+
+    if salida:
+        with open(salida, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2)
+
+    if base is not None:
+        peores = [r for r in resultados if (r['filas'], r['operacion']) in base
+                  and r['p50_ms'] > base[(r['filas'], r['operacion'])]['p50_ms'] * args.tolerancia]
+        for r in peores:
+            print(f"REGRESIÓN: {r['operacion']} con {r['filas']} filas")
+        if peores:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Micro-benchmark de la búsqueda de empleados en App.process_scan.
+
+Compara la máscara booleana sobre el DataFrame (búsqueda anterior) contra el
+índice hash EmployeeIndex para plantillas de 1k, 10k y 100k filas.
+
+Uso:
+    python benchmarks/bench_busqueda_empleados.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from app_empleados import EmployeeIndex  # noqa: E402
+from plantilla_sintetica import generar_plantilla  # noqa: E402
+
+TAMANOS = [1_000, 10_000, 100_000]
+ESCANEOS = 500
+
+
+def medir(func, ids):
+    """Devuelve la latencia media por escaneo en microsegundos."""
+    inicio = time.perf_counter()
+    for employee_id in ids:
+        func(employee_id)
+    return (time.perf_counter() - inicio) / len(ids) * 1e6
+
+
+def main():
+    print(f"{'FILAS':>10}{'MASCARA (us)':>16}{'INDICE (us)':>16}{'CONSTRUCCION (ms)':>20}")
+    for n in TAMANOS:
+        df = generar_plantilla(n)
+        rnd = random.Random(n)
+        ids = [str(100000 + rnd.randrange(n)) for _ in range(ESCANEOS)]
+
+        t_mascara = medir(lambda eid: df[df['Empleado'] == eid], ids)
+
+        inicio = time.perf_counter()
+        index = EmployeeIndex(df)
+        t_construccion = (time.perf_counter() - inicio) * 1e3
+        t_indice = medir(index.get, ids)
+
+        print(f"{n:>10}{t_mascara:>16.1f}{t_indice:>16.2f}{t_construccion:>20.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Sugerencias de códigos del chatbot (CodeSearchIndex) sobre una BDD sintética.
+
+Construye el índice de búsqueda sobre las columnas de SEARCH_COLUMNS de una BDD
+de 500k filas y mide, por tipo de consulta, la latencia de las completaciones
+por prefijo y de las sugerencias aproximadas (una letra cambiada, borrada,
+agregada o dos letras vecinas invertidas). También reporta si el código
+original aparece entre las 10 primeras sugerencias, el tiempo de construcción y
+la memoria del índice. Los códigos sintéticos son densos (casi cualquier código a
+una edición de distancia existe), así que ese porcentaje es una cota baja.
+
+El índice de borrados se construye en la primera búsqueda aproximada y se mide
+aparte. Referencia a 500k filas (~680k códigos únicos, ~5.9M entradas): ~45 MB
+en memoria, un pico de ~155 MB mientras se construye y ~1 s de construcción.
+
+Uso:
+    python benchmarks/bench_chatbot_busqueda.py
+    python benchmarks/bench_chatbot_busqueda.py --filas 100000 500000
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from chatbot_reposicion import CodeSearchIndex  # noqa: E402
+from bench_chatbot_indices import generar_bdd  # noqa: E402
+
+FILAS = [500_000]
+CONSULTAS = 500
+
+
+def con_error(code, tipo, rng):
+    """`code` con un error de captura del tipo indicado."""
+    i = int(rng.integers(1, len(code) - 1))
+    if tipo == "letra cambiada":
+        return code[:i] + ('7' if code[i] != '7' else '3') + code[i + 1:]
+    if tipo == "letra de menos":
+        return code[:i] + code[i + 1:]
+    if tipo == "letra de más":
+        return code[:i] + '5' + code[i:]
+    return code[:i - 1] + code[i] + code[i - 1] + code[i + 1:] # letras invertidas
+
+
+def bench(n, consultas):
+    df = generar_bdd(n, seed=n)
+    rng = np.random.default_rng(n + 1)
+
+    inicio = time.perf_counter()
+    index = CodeSearchIndex(df)
+    construccion = time.perf_counter() - inicio
+    memoria = (index._codes.nbytes + index._fields.nbytes) / 2**20
+    print(f"\n{n} filas: {len(index)} códigos únicos, índice de prefijos construido en {construccion:.2f} s ({memoria:.1f} MB)")
+
+    # El índice de borrados se construye en la primera búsqueda aproximada
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    index.similar(str(index._codes[0]))
+    borrados = time.perf_counter() - inicio
+    pico = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    memoria = (index._hashes.nbytes + index._hash_owners.nbytes) / 2**20
+    print(f"Índice de borrados (primera búsqueda aproximada): {borrados:.2f} s, {len(index._hashes)} entradas "
+          f"({memoria:.1f} MB, pico {pico:.0f} MB al construirlo)")
+
+    codigos = [str(code) for code in rng.choice(index._codes, size=consultas)]
+    casos = [("prefijo (completar)", [(code, code[:max(1, len(code) - 2)]) for code in codigos], index.complete)]
+    for tipo in ("letra cambiada", "letra de menos", "letra de más", "letras invertidas"):
+        casos.append((tipo, [(code, con_error(code, tipo, rng)) for code in codigos if len(code) > 2], index.suggest))
+
+    print(f"{'CONSULTA':<24}{'N':>6}{'P50 ms':>10}{'P95 ms':>10}{'MÁX ms':>10}{'ENCONTRADO':>12}")
+    for nombre, pares, buscar in casos:
+        tiempos = []
+        encontrados = 0
+        for original, consulta in pares:
+            inicio = time.perf_counter()
+            sugerencias = buscar(consulta, limit=10)
+            tiempos.append((time.perf_counter() - inicio) * 1e3)
+            encontrados += original in sugerencias or consulta == original
+        print(f"{nombre:<24}{len(pares):>6}{np.percentile(tiempos, 50):>10.3f}{np.percentile(tiempos, 95):>10.3f}"
+              f"{max(tiempos):>10.3f}{encontrados / len(pares):>12.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--filas', type=int, nargs='+', default=FILAS, help="tamaños de BDD a medir")
+    parser.add_argument('--consultas', type=int, default=CONSULTAS, help="consultas por caso")
+    args = parser.parse_args()
+    for n in args.filas:
+        bench(n, args.consultas)
+
+
+if __name__ == "__main__":
+    main()
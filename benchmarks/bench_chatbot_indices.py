@@ -0,0 +1,140 @@
+"""
+Búsquedas del chatbot de reposición sobre una BDD sintética de 500k filas.
+
+Compara las máscaras booleanas que usaba DatabaseManager (una pasada completa
+por columna en cada consulta) contra los índices hash que se construyen una vez
+al cargar la BDD (PositionIndex). Se miden aciertos y fallos de
+find_direct_code y find_process_related_codes (por proceso y por código de
+producto), además del costo de construir los índices.
+
+Uso:
+    python benchmarks/bench_chatbot_indices.py
+    python benchmarks/bench_chatbot_indices.py --filas 100000 500000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from chatbot_reposicion import DatabaseManager  # noqa: E402
+
+FILAS = [500_000]
+CONSULTAS = 200
+PLANTAS = ["P1", "P2", "P3"]
+TIPOS = ["TXL", "GXL", "SXL", "AVSS"]
+CALIBRES = ["0.35", "0.5", "0.75", "1.25", "2.0"]
+COLORES = ["B", "W", "R", "G", "L", "Y", "BR", "GR"]
+
+
+def generar_bdd(n, seed=0):
+    """
+    BDD sintética de `n` filas con las columnas que lee el chatbot. Cada proceso agrupa
+    ~25 filas y cada circuito (Numero Sencillo, Codigos) aparece en promedio ~1.3 veces.
+    """
+    rng = np.random.default_rng(seed)
+    circuitos = rng.integers(0, int(n / 1.3), size=n)
+    procesos = rng.integers(0, max(1, n // 25), size=n)
+    return pd.DataFrame({
+        'Numero Sencillo': pd.Series(circuitos).map('S{:07d}'.format),
+        'Codigos': pd.Series(circuitos).map('C{:07d}'.format),
+        'Cod A': pd.Series(rng.integers(0, 50_000, size=n)).map('A{:05d}'.format),
+        'Cod B': pd.Series(rng.integers(0, 50_000, size=n)).map('B{:05d}'.format),
+        'Proceso': pd.Series(procesos).map('PR{:06d}'.format),
+        'Maq': rng.choice(["M01", "M02", "M03", "M04"], size=n),
+        'Ckt Grp': rng.choice(["G1", "G2", "G3"], size=n),
+        'Type': rng.choice(TIPOS, size=n),
+        'Size': rng.choice(CALIBRES, size=n),
+        'Color': rng.choice(COLORES, size=n),
+        'Cut Length': rng.integers(100, 5000, size=n).astype(str),
+        'General': rng.choice(["SI", "NO"], size=n),
+        'Planta': rng.choice(PLANTAS, size=n),
+        'Qty': rng.integers(1, 20, size=n),
+    })
+
+
+# --- Implementación anterior (máscaras sobre todo el DataFrame) ---
+def directo_mascara(df, code):
+    result = df[(df['Numero Sencillo'] == code) | (df['Codigos'] == code)]
+    return result if not result.empty else None
+
+
+def proceso_mascara(df, value):
+    found = df[df['Proceso'] == value]
+    if not found.empty:
+        return found, value
+    found = df[df['Codigos'] == value]
+    if not found.empty:
+        process = found.iloc[0]['Proceso']
+        return df[df['Proceso'] == process], process
+    return None, None
+
+
+def medir(func, valores):
+    """Latencia (ms) de `func` para cada valor."""
+    tiempos = []
+    for valor in valores:
+        inicio = time.perf_counter()
+        func(valor)
+        tiempos.append((time.perf_counter() - inicio) * 1e3)
+    return tiempos
+
+
+def mismas_filas(a, b):
+    if a is None or b is None:
+        return a is None and b is None
+    return a.index.equals(b.index)
+
+
+def bench(n, consultas):
+    df = generar_bdd(n, seed=n)
+    rng = np.random.default_rng(n + 1)
+
+    inicio = time.perf_counter()
+    manager = DatabaseManager.from_dataframe(df)
+    construccion = (time.perf_counter() - inicio) * 1e3
+    print(f"\n{n} filas: índices construidos en {construccion:.0f} ms "
+          f"({len(manager._code_index)} códigos, {len(manager._process_index)} procesos)")
+
+    muestra = rng.integers(0, n, size=consultas)
+    casos = [
+        ("directo (Numero Sencillo)", df['Numero Sencillo'].to_numpy()[muestra].tolist(), directo_mascara,
+         manager.find_direct_code, mismas_filas),
+        ("directo (no existe)", [f"X{i:07d}" for i in range(consultas)], directo_mascara,
+         manager.find_direct_code, mismas_filas),
+        ("proceso (Proceso)", df['Proceso'].to_numpy()[muestra].tolist(), proceso_mascara,
+         manager.find_process_related_codes, lambda a, b: mismas_filas(a[0], b[0]) and a[1] == b[1]),
+        ("proceso (Codigos)", df['Codigos'].to_numpy()[muestra].tolist(), proceso_mascara,
+         manager.find_process_related_codes, lambda a, b: mismas_filas(a[0], b[0]) and a[1] == b[1]),
+        ("proceso (no existe)", [f"X{i:07d}" for i in range(consultas)], proceso_mascara,
+         manager.find_process_related_codes, lambda a, b: a == b),
+    ]
+
+    print(f"{'CONSULTA':<28}{'MÁSCARA p50 ms':>16}{'ÍNDICE p50 ms':>15}{'ÍNDICE p95 ms':>15}{'MEJORA':>9}")
+    for nombre, valores, antes, despues, iguales in casos:
+        # Las máscaras son lentas: basta una fracción de las consultas para estimarlas
+        valores_mascara = valores[:max(1, len(valores) // 10)]
+        for valor in valores_mascara:
+            if not iguales(antes(df, valor), despues(valor)):
+                sys.exit(f"Resultado distinto para {nombre}: {valor}")
+        t_antes = medir(lambda v: antes(df, v), valores_mascara)
+        t_despues = medir(despues, valores)
+        p50_antes, p50_despues = np.percentile(t_antes, 50), np.percentile(t_despues, 50)
+        print(f"{nombre:<28}{p50_antes:>16.3f}{p50_despues:>15.3f}{np.percentile(t_despues, 95):>15.3f}"
+              f"{p50_antes / max(p50_despues, 1e-6):>8.0f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--filas', type=int, nargs='+', default=FILAS, help="tamaños de BDD a medir")
+    parser.add_argument('--consultas', type=int, default=CONSULTAS, help="consultas por caso")
+    args = parser.parse_args()
+    for n in args.filas:
+        bench(n, args.consultas)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Memoria de los registros de empleados escaneados (scanned_employees_data).
+
+Compara, para 50k escaneos, el dict por empleado que se usaba antes (8 claves,
+pd.Timestamp y antigüedad como float/int/bool) contra ScannedEmployee
+(__slots__, códigos categóricos y F_Servicio como día epoch). Se miden dos
+casos: escaneos nuevos (valores tomados del índice de la plantilla) y una
+sesión recuperada de SQLite (textos y fechas nuevos por fila).
+
+Uso:
+    python benchmarks/bench_memoria_escaneados.py
+"""
+import os
+import sys
+import tracemalloc
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from app_empleados import EmployeeIndex, ScannedEmployee, to_epoch_day  # noqa: E402
+from plantilla_sintetica import generar_plantilla  # noqa: E402
+
+REGISTROS = 50_000
+
+
+def como_dict(info):
+    """Formato anterior de scanned_employees_data (lo que guardaba handle_scan)."""
+    return {
+        'Nombre': info.Nombre,
+        'Linea': info.LINEA,
+        'Puesto': info.Puesto,
+        'POSITION': info.POSITION,
+        'Antiguedad_Anos': info.Antiguedad_Anos,
+        'Antiguedad_Dias': info.Antiguedad_Dias,
+        'Experiencia': info.Experiencia,
+        'F_Servicio': info.F_Servicio,
+    }
+
+
+def como_registro(info):
+    return ScannedEmployee(info.Nombre, info.LINEA, info.Puesto, info.POSITION, to_epoch_day(info.F_Servicio), info.Antiguedad_Dias)
+
+
+def como_dict_recuperado(info):
+    """Como load_session: cada fila trae sus propios textos y su propio Timestamp."""
+    data = como_dict(info)
+    for key in ('Nombre', 'Linea', 'Puesto', 'POSITION'):
+        data[key] = (' ' + data[key])[1:] # copia del texto, como la que crea sqlite3
+    data['F_Servicio'] = pd.Timestamp(data['F_Servicio'].value)
+    return data
+
+
+def medir(construir, infos):
+    """Memoria (bytes) que queda retenida por el dict {id: registro} de todos los escaneos."""
+    tracemalloc.start()
+    antes = tracemalloc.get_traced_memory()[0]
+    data = {employee_id: construir(info) for employee_id, info in infos}
+    despues = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del data
+    return despues - antes
+
+
+def main():
+    df = generar_plantilla(REGISTROS * 2, seed=17)
+    index = EmployeeIndex(df)
+    ids = df['Empleado'].tolist()[:REGISTROS]
+    infos = [(employee_id, index.get(employee_id)) for employee_id in ids]
+
+    escaneo_dict = medir(como_dict, infos)
+    escaneo_slots = medir(como_registro, infos)
+
+    sesion_dict = medir(como_dict_recuperado, infos)
+    sesion_slots = medir(lambda info: ScannedEmployee.from_dict(como_dict_recuperado(info)), infos)
+
+    print(f"{REGISTROS} registros escaneados")
+    print(f"{'CASO':<22}{'DICT (MB)':>12}{'SLOTS (MB)':>12}{'B/REG DICT':>12}{'B/REG SLOTS':>13}{'AHORRO':>9}")
+    for caso, antes, despues in (("escaneos nuevos", escaneo_dict, escaneo_slots), ("sesión recuperada", sesion_dict, sesion_slots)):
+        print(f"{caso:<22}{antes / 2**20:>12.2f}{despues / 2**20:>12.2f}{antes / REGISTROS:>12.0f}{despues / REGISTROS:>13.0f}{1 - despues / antes:>9.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""
+Plantilla HDC sintética compartida por los benchmarks de app_empleados.
+
+Genera las columnas que usa la app con distribuciones realistas de LINEA,
+POSITION y F Servicio. Los números de empleado son 100000, 100001, ... en orden.
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from app_empleados import seniority_as_of_today  # noqa: E402
+
+# Pocas líneas concentran la mayor parte del personal, como en la planta real
+LINEAS = ["F37", "F45", "F50", "F60", "F62", "F63", "F66", "F71", "F84", "F86", "T31", "T32", "T33", "T34"]
+PESOS_LINEAS = [14, 12, 11, 10, 9, 8, 7, 6, 5, 5, 4, 4, 3, 2]
+POSICIONES = ["MFGOPE", "MFGUPO", "QAINSP", "OTHERS"]
+PESOS_POSICIONES = [80, 8, 7, 5]
+PUESTO_POR_POSICION = {"MFGOPE": "OPD-S", "MFGUPO": "MFGSUP", "QAINSP": "INSP-S", "OTHERS": "OPE-SS"}
+
+
+def generar_plantilla(n, seed=0):
+    """Genera una plantilla HDC sintética de `n` filas con las columnas que usa la app."""
+    rng = np.random.default_rng(seed)
+    posiciones = rng.choice(POSICIONES, size=n, p=np.array(PESOS_POSICIONES) / sum(PESOS_POSICIONES))
+    # ~15% de contrataciones recientes (<= 90 días) y el resto repartido en 15 años
+    recientes = rng.random(n) < 0.15
+    dias = np.where(recientes, rng.integers(0, 91, size=n), rng.integers(91, 15 * 365, size=n))
+    hoy = seniority_as_of_today()
+    return pd.DataFrame({
+        'Empleado': (100000 + np.arange(n)).astype(str),
+        'Nombre': [f"EMPLEADO {i}" for i in range(n)],
+        'LINEA': rng.choice(LINEAS, size=n, p=np.array(PESOS_LINEAS) / sum(PESOS_LINEAS)),
+        'Turno': rng.choice(["A", "B", "C"], size=n),
+        'Puesto': [PUESTO_POR_POSICION[p] for p in posiciones],
+        'POSITION': posiciones,
+        'F Servicio': hoy - pd.to_timedelta(dias, unit="D"),
+    })
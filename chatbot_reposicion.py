@@ -1,17 +1,372 @@
 import tkinter as tk
 from tkinter import scrolledtext, messagebox
+import numpy as np
 import pandas as pd
+import importlib.util
 import os
+import time
+from collections import namedtuple
+from contextlib import contextmanager
 from datetime import datetime
 
+from excel_cache import load_excel_cached
+from export_reposicion import RepositionLine, write_report
+
+# Columnas de BDD.xlsx que usa la aplicación (las que no existan en el archivo se omiten)
+BDD_COLUMNS = [
+    'Numero Sencillo', 'Codigos', 'Cod A', 'Cod B', 'Proceso',
+    'Maq', 'Ckt Grp', 'Type', 'Size', 'Color', 'Cut Length', 'General', 'Planta', 'Qty'
+]
+# Columnas que se leen como texto y se normalizan (sin espacios; vacías -> nulo)
+BDD_TEXT_COLUMNS = [col for col in BDD_COLUMNS if col != 'Qty']
+
+# Motor de lectura de BDD.xlsx: 'calamine' (python-calamine, mucho más rápido) u 'openpyxl'.
+# None elige calamine si está instalado y si no openpyxl (pandas lo abre en modo read-only).
+BDD_ENGINE = None
+
+# Archivo gemelo del reporte para el sistema del almacén: 'csv', 'json' o None (solo el .txt)
+REPOSITION_SIDECAR = None
+
+# Resumen precalculado de un proceso (ver DatabaseManager.process_catalog):
+#   proceso   -> código de proceso
+#   filas     -> filas de la BDD que pertenecen al proceso
+#   circuitos -> posiciones de fila de cada circuito único (Numero Sencillo, Codigos), en orden de aparición
+#   plantas   -> {Planta: filas del proceso en esa planta}
+ProcessEntry = namedtuple('ProcessEntry', ['proceso', 'filas', 'circuitos', 'plantas'])
+
+# Columnas en las que buscan las sugerencias de códigos (prefijo y aproximada)
+SEARCH_COLUMNS = ['Numero Sencillo', 'Codigos', 'Cod A', 'Cod B', 'Proceso']
+# Sugerencias que se muestran cuando un código no se encuentra
+SUGGESTION_LIMIT = 5
+# Distancia de edición máxima de una sugerencia aproximada: una letra cambiada, de más,
+# de menos o dos letras vecinas invertidas
+MAX_EDIT_DISTANCE = 1
+
+# Hash polinomial (módulo 2**64, plegado a 32 bits) de los códigos y de sus variantes con una letra borrada
+_HASH_BASE = 1_000_003
+_HASH_MASK = (1 << 64) - 1
+
+
+def default_excel_engine():
+    """Motor de lectura a usar cuando BDD_ENGINE es None."""
+    return 'calamine' if importlib.util.find_spec('python_calamine') is not None else 'openpyxl'
+
+
+def normalize_text_columns(df, columns):
+    """
+    Convierte `columns` a texto sin espacios en los extremos en una sola pasada vectorizada
+    (todas las columnas juntas). Los nulos y las celdas vacías quedan como nulos reales.
+    """
+    columns = [col for col in columns if col in df.columns]
+    if not columns or df.empty:
+        return df
+    # Todas las columnas apiladas en una sola Series: un solo strip para todo el bloque
+    text = pd.concat([df[col].astype(object) for col in columns], ignore_index=True)
+    present = text.notna()
+    text[present] = text[present].astype(str)
+    text = text.str.strip()
+    values = text.mask(text == '').to_numpy().reshape(len(columns), len(df))
+    for col, column_values in zip(columns, values):
+        df[col] = column_values
+    return df
+
+
+def edit_distance(a, b, max_distance=MAX_EDIT_DISTANCE):
+    """
+    Distancia de edición entre `a` y `b` contando la transposición de dos letras vecinas como una
+    sola edición. Deja de calcular en cuanto supera `max_distance` y entonces devuelve max_distance + 1.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    if max_distance == 1:
+        return _distance_up_to_one(a, b)
+    before_previous, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], before_previous[j - 2] + 1)
+        if min(current) > max_distance:
+            return max_distance + 1
+        before_previous, previous = previous, current
+    return min(previous[-1], max_distance + 1)
+
+
+def _distance_up_to_one(a, b):
+    """Caso max_distance == 1 de edit_distance, en tiempo lineal: 0, 1 o 2 (= más de 1)."""
+    if a == b:
+        return 0
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    if len(a) < len(b):
+        return 1 if a[i:] == b[i + 1:] else 2 # Una letra de más en b
+    if a[i + 1:] == b[i + 1:]:
+        return 1 # Una letra cambiada
+    if i + 1 < len(a) and a[i] == b[i + 1] and a[i + 1] == b[i] and a[i + 2:] == b[i + 2:]:
+        return 1 # Dos letras vecinas invertidas
+    return 2
+
+
+def rank_suggestions(query, candidates, limit=SUGGESTION_LIMIT):
+    """
+    Ordena las sugerencias para `query`: primero los códigos que empiezan con `query` y luego los
+    que están a distancia de edición <= MAX_EDIT_DISTANCE. Pensado para listas cortas (un proceso).
+    """
+    candidates = sorted(set(candidates) - {query})
+    completions = [code for code in candidates if code.startswith(query)]
+    similar = sorted((edit_distance(query, code), code) for code in candidates if not code.startswith(query))
+    return (completions + [code for distance, code in similar if distance <= MAX_EDIT_DISTANCE])[:limit]
+
+
+def _fold_hash(h):
+    """Pliega un hash de 64 bits a 32 (mismo cálculo que la versión vectorizada de CodeSearchIndex)."""
+    return (h ^ (h >> 32)) & 0xFFFFFFFF
+
+
+def _code_hash(code):
+    h = 0
+    for ch in code:
+        h = (h * _HASH_BASE + ord(ch)) & _HASH_MASK
+    return _fold_hash(h)
+
+
+# --- CodeSearchIndex Class ---
+class CodeSearchIndex:
+    """
+    Búsqueda por prefijo y aproximada de los códigos de SEARCH_COLUMNS.
+
+    - Prefijo: los códigos únicos están en un arreglo ordenado; las completaciones de un
+      prefijo son un rango contiguo que se ubica con dos búsquedas binarias.
+    - Aproximada: índice de borrados simétrico. Por cada código se guarda el hash del código y
+      el de cada variante con una letra borrada; dos códigos están a distancia <= 1 si y solo si
+      comparten alguno de esos hashes, así que una consulta son len(código) + 1 búsquedas
+      binarias. Los candidatos se confirman con edit_distance (descarta colisiones de hash).
+      Este índice ocupa (longitud media + 1) * 8 bytes por código único, así que se construye
+      recién en la primera búsqueda aproximada: si nunca se pide una, no se paga.
+
+    Cada código lleva una máscara de bits con las columnas en las que aparece, para
+    limitar las sugerencias a las columnas que usa cada paso de la conversación.
+    """
+    def __init__(self, df, columns=SEARCH_COLUMNS):
+        self.columns = [col for col in columns if col in df.columns]
+        present = [pd.unique(df[col].dropna().astype(str).to_numpy(dtype=object)) for col in self.columns]
+        codes = pd.unique(np.concatenate(present)) if present else np.array([], dtype=object)
+        self._codes = np.sort(np.array(codes[codes != ''], dtype=str))
+        self._fields = np.zeros(len(self._codes), dtype=np.uint8)
+        lookup = pd.Index(self._codes.astype(object))
+        for bit, values in enumerate(present):
+            positions = lookup.get_indexer(values)
+            self._fields[positions[positions >= 0]] |= np.uint8(1 << bit)
+        # Índice de borrados (ver _build_deletion_index); None hasta la primera búsqueda aproximada
+        self._hashes = None
+        self._hash_owners = None
+
+    def _build_deletion_index(self):
+        """Hashes (ordenados) del código completo y de sus variantes con una letra borrada -> posición del código."""
+        n = len(self._codes)
+        width = self._codes.dtype.itemsize // 4 if n else 0
+        # Cada código como fila de puntos de código (los 0 del final son relleno); sin copiarlo a uint64
+        chars = self._codes.view(np.uint32).reshape(n, width)
+        lengths = np.count_nonzero(chars, axis=1)
+        base = np.uint64(_HASH_BASE)
+        # Con arreglos uint64 la aritmética ya es módulo 2**64 (el desbordamiento es el módulo)
+        powers = np.cumprod(np.concatenate(([1], np.full(width, _HASH_BASE))).astype(np.uint64))
+        prefix = np.zeros((n, width + 1), dtype=np.uint64)
+        for j in range(width):
+            prefix[:, j + 1] = prefix[:, j] * base + chars[:, j]
+        rows = np.arange(n, dtype=np.int32)
+        full = prefix[rows, lengths]
+
+        # Cada variante se pliega a 32 bits en cuanto se calcula: los arreglos finales se reservan
+        # una sola vez y los hashes de 64 bits nunca están todos en memoria a la vez
+        def fold(h):
+            return ((h ^ (h >> np.uint64(32))) & np.uint64(0xFFFFFFFF)).astype(np.uint32)
+
+        hashes = np.empty(n + int(lengths.sum()), dtype=np.uint32)
+        owners = np.empty(len(hashes), dtype=np.int32)
+        hashes[:n], owners[:n] = fold(full), rows
+        filled = n
+        for d in range(width):
+            valid = lengths > d
+            rest = powers[lengths[valid] - d - 1]
+            # hash(código sin la letra d) = hash(antes de d) * B**resto + hash(después de d)
+            count = len(rest)
+            hashes[filled:filled + count] = fold(prefix[valid, d] * rest + (full[valid] - prefix[valid, d + 1] * rest))
+            owners[filled:filled + count] = rows[valid]
+            filled += count
+        del prefix
+        order = np.argsort(hashes, kind='stable')
+        self._hashes = hashes[order]
+        self._hash_owners = owners[order]
+
+    def __len__(self):
+        return len(self._codes)
+
+    def _field_mask(self, columns):
+        if columns is None:
+            return np.uint8(0xFF)
+        return np.uint8(sum(1 << self.columns.index(col) for col in columns if col in self.columns))
+
+    def complete(self, prefix, columns=None, limit=SUGGESTION_LIMIT):
+        """Códigos (en orden alfabético) que empiezan con `prefix`, sin incluir `prefix` mismo."""
+        # Un prefijo tan largo como el código más largo no puede completarse (y numpy copiaría
+        # todo el arreglo a un tipo de texto más ancho para comparar)
+        if not prefix or len(prefix) >= self._codes.dtype.itemsize // 4 or prefix[-1] == '\U0010FFFF':
+            return []
+        lo = np.searchsorted(self._codes, prefix, side='right') # Salta el código exacto, si existe
+        # Todo lo que empieza con `prefix` es menor que `prefix` con su última letra incrementada
+        hi = np.searchsorted(self._codes, prefix[:-1] + chr(ord(prefix[-1]) + 1), side='left')
+        matches = lo + np.flatnonzero(self._fields[lo:hi] & self._field_mask(columns))[:limit]
+        return self._codes[matches].tolist()
+
+    def similar(self, query, columns=None, limit=SUGGESTION_LIMIT):
+        """Códigos a distancia de edición <= MAX_EDIT_DISTANCE de `query` (sin `query`), los más parecidos primero."""
+        if not query:
+            return []
+        if self._hashes is None:
+            self._build_deletion_index()
+        variants = np.array(sorted({_code_hash(query)} | {_code_hash(query[:i] + query[i + 1:]) for i in range(len(query))}), dtype=np.uint32)
+        lo = np.searchsorted(self._hashes, variants, side='left')
+        hi = np.searchsorted(self._hashes, variants, side='right')
+        owners = np.unique(np.concatenate([self._hash_owners[a:b] for a, b in zip(lo, hi)]))
+        owners = owners[(self._fields[owners] & self._field_mask(columns)) != 0]
+        scored = sorted((edit_distance(query, code), code) for code in self._codes[owners].tolist() if code != query)
+        return [code for distance, code in scored if distance <= MAX_EDIT_DISTANCE][:limit]
+
+    def suggest(self, query, columns=None, limit=SUGGESTION_LIMIT):
+        """Sugerencias para un código no encontrado: primero completaciones del prefijo, luego códigos parecidos."""
+        suggestions = self.complete(query, columns, limit)
+        for code in self.similar(query, columns, limit):
+            if len(suggestions) >= limit:
+                break
+            if code not in suggestions:
+                suggestions.append(code)
+        return suggestions
+
+
+# --- PositionIndex Class ---
+class PositionIndex:
+    """
+    Índice hash valor -> posiciones de fila, construido una sola vez sobre una o varias columnas.
+
+    Las posiciones se guardan agrupadas por valor en un solo arreglo (con sus desplazamientos),
+    así que construirlo no crea un arreglo por cada código y cada consulta es un dict.get
+    más un slice. Los valores nulos no se indexan.
+    """
+    def __init__(self, *columns):
+        n = len(columns[0]) if columns else 0
+        values = pd.concat(columns, ignore_index=True) if len(columns) > 1 else (columns[0] if columns else pd.Series([], dtype=object))
+        group_ids, uniques = pd.factorize(values)
+        valid = group_ids >= 0
+        # Orden estable: dentro de cada valor las filas quedan en el orden del DataFrame
+        order = np.argsort(group_ids, kind='stable')[np.count_nonzero(~valid):]
+        self._rows = (order % n if n else order).astype(np.int64)
+        self._offsets = np.concatenate(([0], np.cumsum(np.bincount(group_ids[valid], minlength=len(uniques)))))
+        self._groups = dict(zip(uniques.tolist(), range(len(uniques))))
+        self._multi_column = len(columns) > 1
+
+    def __len__(self):
+        return len(self._groups)
+
+    def get(self, value):
+        """Posiciones (ordenadas, sin repetir) de las filas donde aparece `value`; vacío si no existe."""
+        group = self._groups.get(value)
+        if group is None:
+            return self._rows[:0]
+        rows = self._rows[self._offsets[group]:self._offsets[group + 1]]
+        # Con varias columnas una fila puede aparecer dos veces (mismo valor en ambas columnas)
+        return np.unique(rows) if self._multi_column and len(rows) > 1 else rows
+
+
 # --- DatabaseManager Class ---
 class DatabaseManager:
     """
     Gestiona la carga y consulta de datos desde el archivo Excel BDD.xlsx.
     """
-    def __init__(self, filename="BDD.xlsx"):
+    def __init__(self, filename="BDD.xlsx", engine=BDD_ENGINE):
         self.filename = filename
+        self.engine = engine or default_excel_engine()
+        self.cache_hit = False
+        self.load_timings = {} # Fase de la carga -> segundos (ver _timed)
         self.df = self._load_data()
+        with self._timed('índices'):
+            self._build_indexes()
+        with self._timed('catálogo'):
+            self._build_process_catalog()
+        with self._timed('búsqueda'):
+            self.code_search = CodeSearchIndex(self.df)
+        print(f"BDD '{self.filename}' lista en {sum(self.load_timings.values()):.2f} s ("
+              + ", ".join(f"{phase} {seconds:.2f} s" for phase, seconds in self.load_timings.items()) + ")")
+
+    @classmethod
+    def from_dataframe(cls, df, filename=None):
+        """Crea el gestor sobre un DataFrame ya cargado (sin leer el Excel)."""
+        manager = cls.__new__(cls)
+        manager.filename = filename
+        manager.engine = None
+        manager.cache_hit = False
+        manager.load_timings = {}
+        manager.df = df
+        manager._build_indexes()
+        manager._build_process_catalog()
+        manager.code_search = CodeSearchIndex(df)
+        return manager
+
+    def _build_indexes(self):
+        """Índices hash: código (Numero Sencillo o Codigos) -> filas y Proceso -> filas."""
+        code_cols = [col for col in ('Numero Sencillo', 'Codigos') if col in self.df.columns]
+        self._code_index = PositionIndex(*(self.df[col] for col in code_cols))
+        self._process_index = PositionIndex(self.df['Proceso']) if 'Proceso' in self.df.columns else PositionIndex()
+
+    def _build_process_catalog(self):
+        """Proceso -> ProcessEntry con sus circuitos únicos, cuántas filas tiene y el desglose por Planta."""
+        self.process_catalog = {}
+        if self.df.empty or 'Proceso' not in self.df.columns:
+            return
+        pair_cols = [col for col in ('Numero Sencillo', 'Codigos') if col in self.df.columns]
+        processes = self.df['Proceso']
+
+        # Primera fila de cada circuito (Numero Sencillo, Codigos) dentro de cada proceso
+        first_rows = np.flatnonzero((~self.df.duplicated(subset=['Proceso'] + pair_cols) & processes.notna()).to_numpy())
+        circuits = PositionIndex(processes.iloc[first_rows].reset_index(drop=True))
+
+        plants = {}
+        if 'Planta' in self.df.columns:
+            # dropna=False: las filas sin Planta cuentan como 'N/A', así el desglose suma las filas del proceso
+            for (process, plant), count in self.df.groupby(['Proceso', 'Planta'], sort=True, dropna=False).size().items():
+                if pd.isna(process):
+                    continue
+                counts = plants.setdefault(process, {})
+                plant = 'N/A' if pd.isna(plant) else plant
+                counts[plant] = counts.get(plant, 0) + int(count)
+
+        for process in processes.iloc[first_rows].unique().tolist():
+            self.process_catalog[process] = ProcessEntry(
+                proceso=process,
+                filas=len(self._process_index.get(process)),
+                circuitos=first_rows[circuits.get(process)],
+                plantas=plants.get(process, {}),
+            )
+
+    def process_circuits(self, process, limit=None):
+        """Filas de los circuitos únicos de `process` (hasta `limit`); DataFrame vacío si el proceso no existe."""
+        entry = self.process_catalog.get(process)
+        if entry is None:
+            return self.df.iloc[:0]
+        return self.df.iloc[entry.circuitos[:limit]]
+
+    @contextmanager
+    def _timed(self, phase):
+        """Suma a load_timings[phase] lo que tarda el bloque `with`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.load_timings[phase] = self.load_timings.get(phase, 0.0) + time.perf_counter() - start
 
     def _load_data(self):
         """Carga los datos del archivo Excel."""
@@ -19,43 +374,33 @@ class DatabaseManager:
             messagebox.showerror("Error de Archivo", f"El archivo '{self.filename}' no se encontró.")
             return pd.DataFrame()
         try:
-            # Columnas requeridas para la aplicación.
-            # Cargar solo estas columnas reduce el tiempo de lectura de archivos grandes.
-            required_cols = [
-                'Numero Sencillo', 'Codigos', 'Cod A', 'Cod B', 'Proceso', 
-                'Maq', 'Ckt Grp', 'Type', 'Size', 'Color', 'Cut Length', 'General', 'Planta', 'Qty'
-            ]
-            
-            # Leer solo los encabezados para verificar qué columnas existen realmente en el archivo Excel
-            excel_columns = pd.read_excel(self.filename, sheet_name=0, nrows=0).columns
-            
-            # Filtrar las columnas requeridas para incluir solo las que existen en el Excel
-            cols_to_use = [col for col in required_cols if col in excel_columns]
-
-            df = pd.read_excel(self.filename, usecols=cols_to_use)
-            
-            # Asegurarse de que las columnas de código sean de tipo string para búsquedas consistentes
-            # y se stripteen espacios en blanco
-            # Se aplica solo a las columnas que fueron cargadas y que son relevantes para el stripping
-            cols_to_strip_and_str = [
-                'Numero Sencillo', 'Codigos', 'Cod A', 'Cod B', 'Proceso', 
-                'Maq', 'Ckt Grp', 'Type', 'Size', 'Color', 'Cut Length', 'General', 'Planta'
-            ]
-            
-            for col in cols_to_strip_and_str:
-                if col in df.columns: # Verificar si la columna existe en el DataFrame cargado
-                    df[col] = df[col].astype(str).str.strip()
+            # La caché en disco evita volver a parsear el Excel si no ha cambiado
+            start = time.perf_counter()
+            df, self.cache_hit = load_excel_cached(self.filename, self._read_excel, variant='bdd-v2')
+            # Lo que no fue lectura ni normalización es la caché (firma del archivo y pickle)
+            self.load_timings['caché'] = time.perf_counter() - start - sum(self.load_timings.values())
+            print(f"BDD '{self.filename}' cargada ({'caché' if self.cache_hit else f'Excel ({self.engine}), caché regenerada'}): {len(df)} filas")
             return df
         except Exception as e:
             messagebox.showerror("Error de Lectura", f"No se pudo leer el archivo Excel: {e}")
             return pd.DataFrame()
 
+    def _read_excel(self, filename):
+        """Lee el Excel en una sola pasada y normaliza las columnas de texto (solo cuando la caché no es válida)."""
+        with self._timed('lectura'):
+            # usecols como función: los encabezados se validan en la misma lectura, sin abrir el libro dos veces.
+            # dtype=str conserva los códigos numéricos sin '.0' y deja las celdas vacías como nulos
+            df = pd.read_excel(filename, sheet_name=0, engine=self.engine, usecols=lambda col: col in BDD_COLUMNS,
+                               dtype={col: str for col in BDD_TEXT_COLUMNS})
+        with self._timed('normalización'):
+            return normalize_text_columns(df, BDD_TEXT_COLUMNS)
+
     def find_direct_code(self, code):
         """Busca un código directo en 'Numero Sencillo' o 'Codigos' y devuelve la fila completa."""
         if self.df.empty:
             return None
-        result = self.df[(self.df['Numero Sencillo'] == code) | (self.df['Codigos'] == code)]
-        return result if not result.empty else None
+        rows = self._code_index.get(code)
+        return self.df.iloc[rows] if len(rows) else None
 
     def find_process_related_codes(self, input_code_or_process):
         """
@@ -68,22 +413,33 @@ class DatabaseManager:
             return None, None # Devuelve None para resultados y para el proceso_identificado
 
         # 1. Intentar encontrar la entrada como un Código de Proceso (Columna M)
-        found_by_process = self.df[self.df['Proceso'] == input_code_or_process]
-        if not found_by_process.empty:
-            return found_by_process, input_code_or_process
-
-        # 2. Intentar encontrar la entrada como un Código de Producto (Columna K)
-        found_by_codigo_producto = self.df[self.df['Codigos'] == input_code_or_process]
-        if not found_by_codigo_producto.empty:
+        rows = self._process_index.get(input_code_or_process)
+        if len(rows):
+            return self.df.iloc[rows], input_code_or_process
+
+        # 2. Intentar encontrar la entrada como un Código de Producto (Columna K).
+        # El índice de códigos también incluye 'Numero Sencillo': se conservan solo las filas de 'Codigos'
+        rows = self._code_index.get(input_code_or_process)
+        rows = rows[self.df['Codigos'].iloc[rows].to_numpy() == input_code_or_process]
+        if len(rows):
             # Si se encuentra como código de producto, obtener su código de proceso
-            identified_process = found_by_codigo_producto.iloc[0]['Proceso']
+            identified_process = self.df['Proceso'].iat[rows[0]]
             # Y luego buscar todos los elementos de ese proceso
-            all_codes_for_this_process = self.df[self.df['Proceso'] == identified_process]
-            return all_codes_for_this_process, identified_process
+            return self.df.iloc[self._process_index.get(identified_process)], identified_process
         
         # Si no se encontró ni como proceso ni como código de producto
         return None, None
     
+    def suggest_codes(self, code, columns=None, within=None):
+        """
+        Códigos parecidos a `code` para sugerir cuando no se encuentra: completaciones del prefijo
+        y códigos a una edición de distancia, solo de `columns` (por defecto SEARCH_COLUMNS).
+        Con `within` (lista corta, p. ej. los códigos de un proceso) se sugiere solo entre esos códigos.
+        """
+        if within is not None:
+            return rank_suggestions(code, within)
+        return self.code_search.suggest(code, columns)
+
     def find_code_in_process(self, process_df, code_to_find):
         """
         Busca un código específico dentro de un DataFrame que representa un proceso.
@@ -111,6 +467,7 @@ class ChatbotApp:
 
         self.db_manager = DatabaseManager()
         self.conversation_state = {}
+        self.reposition_cart = [] # RepositionLine acumuladas hasta imprimir el reporte
         self.history = []
 
         self._create_widgets()
@@ -169,6 +526,21 @@ class ChatbotApp:
 
         self._process_user_response(user_text)
 
+    @staticmethod
+    def _suggestions_text(suggestions):
+        """Texto '¿Quiso decir ...?' para los mensajes de código no encontrado (vacío si no hay sugerencias)."""
+        if not suggestions:
+            return ""
+        return " ¿Quiso decir: " + ", ".join(f"**{code}**" for code in suggestions) + "?"
+
+    def _add_to_cart(self, line):
+        """Agrega una reposición terminada al carrito y pregunta si se desea otra."""
+        self.reposition_cart.append(line)
+        circuits = sum(len(cart_line.items) for cart_line in self.reposition_cart)
+        self._display_message("Bot", f"Reposición agregada ({len(self.reposition_cart)} en total, {circuits} circuitos).\n"
+                                     "¿Desea realizar otra reposición? (Sí/No)")
+        self.conversation_state["step"] = "ask_another_reposition"
+
     def _process_user_response(self, response):
         """Lógica principal para procesar las respuestas del usuario."""
         step = self.conversation_state.get("step")
@@ -211,7 +583,8 @@ class ChatbotApp:
                 self._display_message("Bot", details_msg)
                 self.conversation_state["step"] = "confirm_direct_item"
             else:
-                self._display_message("Bot", f"El código directo '{response.upper()}' no fue encontrado en la base de datos. Por favor, intente de nuevo.")
+                suggestions = self.db_manager.suggest_codes(response.upper(), columns=['Numero Sencillo', 'Codigos'])
+                self._display_message("Bot", f"El código directo '{response.upper()}' no fue encontrado en la base de datos.{self._suggestions_text(suggestions)} Por favor, intente de nuevo.")
                 # Permanece en el mismo paso para reingresar el código
 
         elif step == "confirm_direct_item":
@@ -230,27 +603,31 @@ class ChatbotApp:
                 if quantity <= 0:
                     raise ValueError
                 self.conversation_state["quantity"] = quantity
-                self._display_message("Bot", "¿Desea realizar otra reposición? (Sí/No)")
-                self.conversation_state["step"] = "ask_another_reposition"
+                item = self.conversation_state["found_item"]
+                self._add_to_cart(RepositionLine('directo', None, None, quantity, [item.to_dict()]))
             except ValueError:
                 self._display_message("Bot", "Cantidad inválida. Por favor, ingrese un número entero positivo.")
 
         elif step == "ask_another_reposition":
             if response in ["si", "sí", "s"]:
-                self.conversation_state = {} # Reinicia el estado para una nueva reposición
-                self._display_message("Bot", "Reiniciando el proceso.")
-                self.root.after(500, self._ask_initial_reposition)
+                # Solo se reinicia el artículo en curso; el carrito conserva las reposiciones anteriores
+                self.conversation_state = {"step": "ask_type"}
+                self._display_message("Bot", "¿Desea reponer un **directo** o un **proceso**?")
             elif response in ["no", "n"]:
-                self._display_message("Bot", "¿Desea **imprimir** la información de la reposición? (Sí/No)")
+                count = len(self.reposition_cart)
+                self._display_message("Bot", f"¿Desea **imprimir** la información de {'la reposición' if count == 1 else f'las {count} reposiciones'}? (Sí/No)")
                 self.conversation_state["step"] = "ask_print"
             else:
                 self._display_message("Bot", "Por favor, responda 'Sí' o 'No'.")
 
         elif step == "ask_print":
             if response in ["si", "sí", "s"]:
-                self._print_reposition_info()
-                self._display_message("Bot", "Reposición completada y enviada a impresión. ¡Gracias por usar el asistente!")
-                self.root.after(2000, self.root.destroy)
+                if self._print_reposition_info():
+                    self._display_message("Bot", "Reposición completada y enviada a impresión. ¡Gracias por usar el asistente!")
+                    self.root.after(2000, self.root.destroy)
+                else:
+                    # El carrito se conserva: el usuario puede reintentar la impresión
+                    self._display_message("Bot", "No se pudo guardar el reporte. ¿Desea **intentar imprimir** de nuevo? (Sí/No)")
             elif response in ["no", "n"]:
                 self._display_message("Bot", "Reposición completada. No se realizará la impresión. ¡Gracias por usar el asistente!")
                 self.root.after(2000, self.root.destroy)
@@ -265,38 +642,34 @@ class ChatbotApp:
                 self.conversation_state["found_processes"] = found_items_df # DataFrame completo del proceso
                 self.conversation_state["process_code_identified"] = identified_process_code # Almacena el proceso real
                 
-                details_msg = (f"Hemos identificado el proceso: **{identified_process_code}**.\n"
-                               f"Este proceso incluye los siguientes códigos generales:\n")
-                
-                # Modificación para evitar duplicados al listar códigos del proceso
-                displayed_codes = set() # Usar un conjunto para almacenar pares (Numero Sencillo, Codigos) ya mostrados
-                display_count = 0
+                # El catálogo ya tiene los circuitos sin duplicados: no hace falta recorrer el DataFrame
+                entry = self.db_manager.process_catalog.get(identified_process_code)
                 display_limit = 10 # Se aumenta un poco el límite para mostrar más, si existen
-                
-                for index, row in found_items_df.iterrows():
-                    sencillo = row.get('Numero Sencillo', 'N/A')
-                    general = row.get('Codigos', 'N/A')
-                    code_pair = (sencillo, general) # Tupla para identificar el par único
-
-                    if code_pair not in displayed_codes:
-                        details_msg += (
-                            f"- Sencillo: {sencillo} "
-                            f"(General: {general})\n"
-                        )
-                        displayed_codes.add(code_pair)
-                        display_count += 1
-                        if display_count >= display_limit:
-                            break # Limitar el número de elementos mostrados inicialmente
-                
-                if len(found_items_df) > display_count: # Corrección para el mensaje de "y X más"
-                    details_msg += f"...y más códigos relacionados.\n"
+                circuits = self.db_manager.process_circuits(identified_process_code, limit=display_limit)
+                total_circuits = len(entry.circuitos) if entry is not None else len(circuits)
+
+                details_msg = (f"Hemos identificado el proceso: **{identified_process_code}**.\n"
+                               f"Este proceso incluye {total_circuits} circuitos únicos ({len(found_items_df)} filas)")
+                if entry is not None and entry.plantas:
+                    details_msg += " - " + ", ".join(f"Planta {plant}: {count}" for plant, count in entry.plantas.items())
+                details_msg += ".\nCódigos generales:\n"
+
+                for sencillo, general in zip(circuits['Numero Sencillo'], circuits['Codigos']):
+                    details_msg += (
+                        f"- Sencillo: {sencillo} "
+                        f"(General: {general})\n"
+                    )
+
+                if total_circuits > len(circuits):
+                    details_msg += f"...y {total_circuits - len(circuits)} códigos relacionados más.\n"
                 
                 details_msg += "\n¿Es este el proceso que desea reponer? (Sí/No)"
 
                 self._display_message("Bot", details_msg)
                 self.conversation_state["step"] = "confirm_process_items"
             else:
-                self._display_message("Bot", f"El código o proceso '{input_value}' no fue encontrado en la base de datos. Por favor, intente de nuevo.")
+                suggestions = self.db_manager.suggest_codes(input_value, columns=['Proceso', 'Codigos'])
+                self._display_message("Bot", f"El código o proceso '{input_value}' no fue encontrado en la base de datos.{self._suggestions_text(suggestions)} Por favor, intente de nuevo.")
                 # Permanece en el mismo paso para reingresar el código
 
         elif step == "confirm_process_items":
@@ -340,7 +713,10 @@ class ChatbotApp:
                 self._display_message("Bot", details_msg)
                 self.conversation_state["step"] = "confirm_specific_process_item"
             else:
-                self._display_message("Bot", f"El código '{specific_code}' no fue encontrado en este proceso. Por favor, revise e intente de nuevo.")
+                # Solo se sugieren circuitos de este mismo proceso
+                process_codes = pd.concat([process_df['Numero Sencillo'], process_df['Codigos']]).dropna().tolist()
+                suggestions = self.db_manager.suggest_codes(specific_code, within=process_codes)
+                self._display_message("Bot", f"El código '{specific_code}' no fue encontrado en este proceso.{self._suggestions_text(suggestions)} Por favor, revise e intente de nuevo.")
                 # Permanece en el mismo paso para reingresar el código
 
         elif step == "confirm_specific_process_item":
@@ -359,8 +735,9 @@ class ChatbotApp:
                 if quantity <= 0:
                     raise ValueError
                 self.conversation_state["quantity"] = quantity
-                self._display_message("Bot", "¿Desea imprimir la información de la reposición? (Sí/No)")
-                self.conversation_state["step"] = "ask_print_process"
+                process = self.conversation_state["process_code_identified"]
+                circuits = self.db_manager.process_circuits(process).to_dict('records')
+                self._add_to_cart(RepositionLine('proceso', 'full_group', process, quantity, circuits))
             except ValueError:
                 self._display_message("Bot", "Cantidad inválida. Por favor, ingrese un número entero positivo.")
 
@@ -370,197 +747,30 @@ class ChatbotApp:
                 if quantity <= 0:
                     raise ValueError
                 self.conversation_state["quantity"] = quantity
-                self._display_message("Bot", "¿Desea imprimir la información de la reposición? (Sí/No)")
-                self.conversation_state["step"] = "ask_print_process"
+                process = self.conversation_state["process_code_identified"]
+                item = self.conversation_state["found_item"]
+                self._add_to_cart(RepositionLine('proceso', 'single_circuit', process, quantity, [item.to_dict()]))
             except ValueError:
                 self._display_message("Bot", "Cantidad inválida. Por favor, ingrese un número entero positivo.")
 
-        elif step == "ask_print_process":
-            if response in ["si", "sí", "s"]:
-                self._print_reposition_info()
-                self._display_message("Bot", "Reposición de proceso completada y enviada a impresión. ¡Gracias por usar el asistente!")
-                self.root.after(2000, self.root.destroy)
-            elif response in ["no", "n"]:
-                self._display_message("Bot", "Reposición de proceso completada. No se realizará la impresión. ¡Gracias por usar el asistente!")
-                self.root.after(2000, self.root.destroy)
-            else:
-                self._display_message("Bot", "Por favor, responda 'Sí' o 'No'.")
-
     def _print_reposition_info(self):
-        """Simula la impresión de la información de la reposición."""
-        reposition_type = self.conversation_state.get("type")
-        output_filename = f"reposicion_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
-
-        with open(output_filename, "w", encoding="utf-8") as f:
-            f.write(f"--- REPORTE DE REPOSICIÓN ---\n")
-            f.write(f"Fecha y Hora: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-            f.write(f"Tipo de Reposición: {reposition_type.upper()}\n")
-            f.write("-" * 30 + "\n\n")
-
-            if reposition_type == "directo":
-                item = self.conversation_state.get("found_item")
-                quantity_to_print = self.conversation_state.get("quantity") # Cantidad proporcionada por el usuario
-
-                f.write(f"Código Directo: {item.get('Numero Sencillo', 'N/A')}\n")
-                f.write(f"Cantidad a Reponer: {quantity_to_print} piezas\n\n")
-
-                f.write(f"{'NUMERO DE PARTE':<28}{'CODIGO':<15}{'CIRCUITO A':<15}{'CIRCUITO B':<15}{'PROCESO':<15}{'CANTIDAD':<12}{'GRUPO(SI/NO)':<15}{'PLANTA':<10}\n")
-                f.write(f"{'-'*28:<28}{'-'*15:<15}{'-'*15:<15}{'-'*15:<15}{'-'*15:<15}{'-'*12:<12}{'-'*15:<15}{'-'*10:<10}\n")
-
-                # Obtener valores para la línea de formato
-                numero_parte = item.get('Numero Sencillo', 'N/A')
-                codigo_general = item.get('Codigos', 'N/A')
-                circuito_a = item.get('Cod A', 'N/A')
-                circuito_b = item.get('Cod B', 'N/A')
-                proceso_tipo = item.get('Proceso', 'N/A') # Si es "Directo" o el nombre del proceso
-                grupo_status = "NO" # Para un directo, no es parte de un grupo de reposición
-                planta = item.get('Planta', 'N/A') # Añadir información de planta
-
-                f.write(f"{numero_parte:<28}{codigo_general:<15}{circuito_a:<15}{circuito_b:<15}{proceso_tipo:<15}{quantity_to_print:<12}{grupo_status:<15}{planta:<10}\n\n")
-                
-                f.write("Detalles Completos del Artículo (BDD):\n")
-                for col in item.index:
-                    f.write(f"  {col}: {item[col]}\n")
-                
-                # Ejemplo de impresión para directo (consola)
-                print("\n" + "="*80)
-                print("--- REPORTE DE IMPRESIÓN (DIRECTO) ---")
-                print(f"Fecha: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-                print(f"Tipo: DIRECTO")
-                print(f"Código Directo: {item.get('Numero Sencillo', 'N/A')}")
-                print(f"Cantidad a Reponer: {quantity_to_print} piezas\n")
-
-                print(f"{'NUMERO DE PARTE':<28}{'CODIGO':<15}{'CIRCUITO A':<15}{'CIRCUITO B':<15}{'PROCESO':<15}{'CANTIDAD':<12}{'GRUPO(SI/NO)':<15}{'PLANTA':<10}")
-                print(f"{'-'*28:<28}{'-'*15:<15}{'-'*15:<15}{'-'*15:<15}{'-'*15:<15}{'-'*12:<12}{'-'*15:<15}{'-'*10:<10}")
-                print(f"{numero_parte:<28}{codigo_general:<15}{circuito_a:<15}{circuito_b:<15}{proceso_tipo:<15}{quantity_to_print:<12}{grupo_status:<15}{planta:<10}\n")
-
-                print("Detalles Completos del Artículo (BDD):")
-                for col in item.index:
-                    print(f"  {col}: {item[col]}")
-                print("="*80 + "\n")
-
-            elif reposition_type == "proceso":
-                process_code_identified = self.conversation_state.get("process_code_identified")
-                scope = self.conversation_state.get("reposition_scope")
-                quantity_to_print = self.conversation_state.get("quantity") # Cantidad proporcionada por el usuario
-                found_processes_df = self.conversation_state.get("found_processes") # DataFrame completo de items del proceso
-
-                f.write(f"Reposición para Proceso:\n")
-                f.write(f"  Código de Proceso Identificado: {process_code_identified}\n")
-                f.write(f"  Alcance de Reposición: {'Grupo Completo' if scope == 'full_group' else 'Circuito Específico'}\n")
-                f.write(f"  Cantidad Solicitada: {quantity_to_print} piezas\n\n")
-
-                f.write(f"{'NUMERO DE PARTE':<28}{'CODIGO':<15}{'CIRCUITO A':<15}{'CIRCUITO B':<15}{'PROCESO':<15}{'CANTIDAD':<12}{'GRUPO(SI/NO)':<15}{'PLANTA':<10}\n")
-                f.write(f"{'-'*28:<28}{'-'*15:<15}{'-'*15:<15}{'-'*15:<15}{'-'*15:<15}{'-'*12:<12}{'-'*15:<15}{'-'*10:<10}\n")
-
-                if scope == "full_group":
-                    # Almacenar códigos de parte y generales únicos para el reporte detallado
-                    reported_items = set()
-                    
-                    for index, row in found_processes_df.iterrows():
-                        numero_parte = row.get('Numero Sencillo', 'N/A')
-                        codigo_general = row.get('Codigos', 'N/A')
-                        circuito_a = row.get('Cod A', 'N/A')
-                        circuito_b = row.get('Cod B', 'N/A')
-                        proceso_tipo = row.get('Proceso', 'N/A') 
-                        grupo_status = "SI" # Es parte de un grupo de reposición
-                        planta = row.get('Planta', 'N/A') # Añadir información de planta
-
-                        # Solo imprimir la línea resumen una vez por combinación única de Numero Sencillo y Codigos
-                        if (numero_parte, codigo_general) not in reported_items:
-                            f.write(f"{numero_parte:<28}{codigo_general:<15}{circuito_a:<15}{circuito_b:<15}{proceso_tipo:<15}{quantity_to_print:<12}{grupo_status:<15}{planta:<10}\n")
-                            reported_items.add((numero_parte, codigo_general))
-
-                    f.write("\nDetalles Completos de los Artículos del Grupo (BDD) - Sin duplicados en la lista:\n")
-                    # Crear una lista de tuplas únicas (Numero Sencillo, Codigos) para los detalles completos
-                    unique_items_details = []
-                    seen_pairs = set()
-                    for index, row in found_processes_df.iterrows():
-                        sencillo = row.get('Numero Sencillo', 'N/A')
-                        general = row.get('Codigos', 'N/A')
-                        if (sencillo, general) not in seen_pairs:
-                            unique_items_details.append(row)
-                            seen_pairs.add((sencillo, general))
-
-                    for i, row in enumerate(unique_items_details):
-                        f.write(f"\n--- Item Único {i+1} ({row.get('Numero Sencillo', 'N/A')}) ---\n")
-                        for col in row.index:
-                            f.write(f"  {col}: {row[col]}\n")
-
-                elif scope == "single_circuit":
-                    # Usamos 'found_item' que ahora almacena la fila del circuito específico seleccionado
-                    item_info = self.conversation_state.get("found_item")
-                    if item_info is not None:
-                        numero_parte = item_info.get('Numero Sencillo', 'N/A')
-                        codigo_general = item_info.get('Codigos', 'N/A')
-                        circuito_a = item_info.get('Cod A', 'N/A')
-                        circuito_b = item_info.get('Cod B', 'N/A')
-                        proceso_tipo = item_info.get('Proceso', 'N/A') 
-                        grupo_status = "NO" # No es una reposición de grupo completo, es un circuito específico
-                        planta = item_info.get('Planta', 'N/A') # Añadir información de planta
-
-                        f.write(f"{numero_parte:<28}{codigo_general:<15}{circuito_a:<15}{circuito_b:<15}{proceso_tipo:<15}{quantity_to_print:<12}{grupo_status:<15}{planta:<10}\n")
-                        
-                        f.write("\nDetalles Completos del Circuito Específico (BDD):\n")
-                        for col in item_info.index:
-                            f.write(f"  {col}: {item_info[col]}\n")
-                    else:
-                        f.write("  No se encontraron detalles para el circuito específico seleccionado.\n")
-
-                # Ejemplo de impresión para proceso (consola)
-                print("\n" + "="*80)
-                print("--- REPORTE DE IMPRESIÓN (PROCESO) ---")
-                print(f"Fecha: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-                print(f"Tipo: PROCESO")
-                print(f"Código de Proceso Identificado: {process_code_identified}")
-                print(f"Alcance: {'Grupo Completo' if scope == 'full_group' else 'Circuito Específico'}")
-                print(f"Cantidad a Reponer: {quantity_to_print} piezas\n")
-
-                print(f"{'NUMERO DE PARTE':<28}{'CODIGO':<15}{'CIRCUITO A':<15}{'CIRCUITO B':<15}{'PROCESO':<15}{'CANTIDAD':<12}{'GRUPO(SI/NO)':<15}{'PLANTA':<10}")
-                print(f"{'-'*28:<28}{'-'*15:<15}{'-'*15:<15}{'-'*15:<15}{'-'*15:<15}{'-'*12:<12}{'-'*15:<15}{'-'*10:<10}")
-
-                if scope == "full_group":
-                    # Almacenar códigos de parte y generales únicos para la impresión en consola
-                    reported_items_console = set()
-                    for index, row in found_processes_df.iterrows():
-                        numero_parte = row.get('Numero Sencillo', 'N/A')
-                        codigo_general = row.get('Codigos', 'N/A')
-                        circuito_a = row.get('Cod A', 'N/A')
-                        circuito_b = row.get('Cod B', 'N/A')
-                        proceso_tipo = row.get('Proceso', 'N/A')
-                        grupo_status = "SI"
-                        planta = row.get('Planta', 'N/A')
-                        if (numero_parte, codigo_general) not in reported_items_console:
-                            print(f"{numero_parte:<28}{codigo_general:<15}{circuito_a:<15}{circuito_b:<15}{proceso_tipo:<15}{quantity_to_print:<12}{grupo_status:<15}{planta:<10}")
-                            reported_items_console.add((numero_parte, codigo_general))
-                    
-                    print("\nDetalles Completos de los Artículos del Grupo (BDD) - Sin duplicados en la lista:")
-                    # Reutilizar unique_items_details para la consola
-                    for i, row in enumerate(unique_items_details):
-                        print(f"\n--- Item Único {i+1} ({row.get('Numero Sencillo', 'N/A')}) ---")
-                        for col in row.index:
-                            print(f"  {col}: {row[col]}")
-
-                elif scope == "single_circuit":
-                    item_info = self.conversation_state.get("found_item")
-                    if item_info is not None:
-                        numero_parte = item_info.get('Numero Sencillo', 'N/A')
-                        codigo_general = item_info.get('Codigos', 'N/A')
-                        circuito_a = item_info.get('Cod A', 'N/A')
-                        circuito_b = item_info.get('Cod B', 'N/A')
-                        proceso_tipo = item_info.get('Proceso', 'N/A')
-                        grupo_status = "NO"
-                        planta = item_info.get('Planta', 'N/A')
-                        print(f"{numero_parte:<28}{codigo_general:<15}{circuito_a:<15}{circuito_b:<15}{proceso_tipo:<15}{quantity_to_print:<12}{grupo_status:<15}{planta:<10}")
-                        print("\nDetalles Completos del Circuito Específico (BDD):")
-                        for col in item_info.index:
-                            print(f"  {col}: {item_info[col]}")
-                    else:
-                        print("  No se encontraron detalles para el circuito específico seleccionado.")
-                print("="*80 + "\n")
-
-        messagebox.showinfo("Impresión Simulada", f"Información de reposición guardada en '{output_filename}'")
+        """Simula la impresión: un solo reporte con todas las reposiciones del carrito. Devuelve True si se guardó."""
+        now = datetime.now()
+        output_filename = f"reposicion_{now.strftime('%Y%m%d_%H%M%S')}.txt"
+        try:
+            report, written = write_report(output_filename, self.reposition_cart, now, sidecar=REPOSITION_SIDECAR)
+        except OSError as e:
+            messagebox.showerror("Error de Impresión", f"No se pudo guardar el reporte '{output_filename}': {e}")
+            return False
+
+        # Ejemplo de impresión (consola): el mismo texto del archivo
+        print("\n" + "=" * 80)
+        print(report + "=" * 80 + "\n")
+
+        messagebox.showinfo("Impresión Simulada", f"Información de reposición guardada en {', '.join(repr(path) for path in written)}")
         self.history.append(("bot", f"Reporte guardado en {output_filename}"))
+        self.reposition_cart = []
+        return True
 
 # --- Main execution ---
 if __name__ == "__main__":
@@ -0,0 +1,35 @@
+"""
+Lectura de config.ini para la aplicación de control de empleados.
+
+Cualquier clave que falte (o un config.ini inexistente) toma el valor por
+defecto de este módulo, así que la aplicación arranca igual sin configuración.
+"""
+import configparser
+from collections import namedtuple
+
+CONFIG_FILE = 'config.ini'
+
+# Valores por defecto (los que la aplicación usaba antes de leer config.ini)
+DEFAULT_DATA_FILE = 'hdc.xlsx'
+DEFAULT_EXPORT_FILE = 'data/reporte_empleados.xlsx'
+DEFAULT_LINES = ["F37", "F45", "F50", "F60", "F62", "F63", "F66", "F71", "F84", "F86", "T31", "T32", "T33", "T34"]
+
+AppConfig = namedtuple('AppConfig', ['archivo_datos', 'archivo_exportado', 'lineas_validas', 'nombre_empresa'])
+
+
+def load_config(path=CONFIG_FILE):
+    """Lee [BASE] y [PARAMETROS] de config.ini y devuelve un AppConfig."""
+    parser = configparser.ConfigParser()
+    try:
+        parser.read(path, encoding='utf-8')
+    except configparser.Error as e:
+        print(f"No se pudo leer '{path}', se usan los valores por defecto: {e}")
+        parser = configparser.ConfigParser()
+
+    lines = [line.strip() for line in parser.get('PARAMETROS', 'lineas_validas', fallback='').split(',') if line.strip()]
+    return AppConfig(
+        archivo_datos=parser.get('BASE', 'archivo_datos', fallback=DEFAULT_DATA_FILE).strip() or DEFAULT_DATA_FILE,
+        archivo_exportado=parser.get('BASE', 'archivo_exportado', fallback=DEFAULT_EXPORT_FILE).strip() or DEFAULT_EXPORT_FILE,
+        lineas_validas=lines or list(DEFAULT_LINES),
+        nombre_empresa=parser.get('PARAMETROS', 'nombre_empresa', fallback='').strip(),
+    )
@@ -0,0 +1,301 @@
+"""
+Persistencia en SQLite (db.sqlite) para la aplicación de control de empleados.
+
+Los escaneos de cada turno se guardan en la tabla 'escaneos' para que un cierre
+inesperado de la aplicación no pierda la asistencia registrada. La escritura la
+hace un hilo de fondo en lotes, de modo que el escaneo nunca espera al disco.
+
+La plantilla (HDC.xlsx) también puede importarse a la tabla 'empleados' para
+buscar empleados con consultas puntuales en lugar de tener todo el Excel en memoria.
+"""
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from excel_cache import file_signature
+
+# Base de datos local que acompaña a la aplicación
+DB_FILE = 'db.sqlite'
+
+# Hora a la que empieza el primer turno; los escaneos antes de esta hora
+# pertenecen todavía a la sesión (turno) del día anterior
+SHIFT_START_HOUR = 6
+
+# Reintentos del último lote al cerrar, antes de darlo por perdido
+CLOSE_RETRIES = 3
+CLOSE_RETRY_DELAY = 0.5
+
+SCHEMA_ESCANEOS = """
+CREATE TABLE IF NOT EXISTS escaneos (
+    sesion TEXT NOT NULL,
+    numero TEXT NOT NULL,
+    nombre TEXT,
+    linea TEXT,
+    puesto TEXT,
+    position TEXT,
+    f_servicio TEXT,
+    escaneado_en TEXT NOT NULL,
+    linea_sesion TEXT,
+    PRIMARY KEY (sesion, numero)
+)
+"""
+
+# Sentencias fijas: sqlite3 las prepara una vez y reutiliza el statement compilado
+INSERT_ESCANEO = (
+    "INSERT OR IGNORE INTO escaneos (sesion, numero, nombre, linea, puesto, position, f_servicio, escaneado_en, linea_sesion) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+SELECT_SESION = (
+    "SELECT numero, linea_sesion, nombre, linea, puesto, position, f_servicio FROM escaneos "
+    "WHERE sesion = ? ORDER BY escaneado_en, rowid"
+)
+
+
+# Columnas que la app usa de la plantilla: columna en 'empleados' -> encabezado en HDC.xlsx.
+# 'numero, nombre, linea, turno, puesto' ya existen en la tabla; el resto se agrega al importar.
+ROSTER_COLUMNS = [
+    ('numero', 'Empleado'),
+    ('nombre', 'Nombre'),
+    ('linea', 'LINEA'),
+    ('turno', 'Turno'),
+    ('puesto', 'Puesto'),
+    ('position', 'POSITION'),
+    ('f_servicio', 'F Servicio'),
+]
+
+# Filas que se insertan por cada executemany al importar la plantilla
+IMPORT_CHUNK_SIZE = 1000
+
+SCHEMA_METADATOS = """
+CREATE TABLE IF NOT EXISTS metadatos (
+    clave TEXT PRIMARY KEY,
+    valor TEXT
+)
+"""
+
+SELECT_EMPLEADO = "SELECT nombre, linea, puesto, position, f_servicio FROM empleados WHERE numero = ?"
+
+
+def current_session_key(now=None):
+    """Identificador de la sesión (turno) actual: fecha en formato ISO."""
+    now = now or datetime.now()
+    return (now - timedelta(hours=SHIFT_START_HOUR)).date().isoformat()
+
+
+def connect(path=DB_FILE, **kwargs):
+    """Abre una conexión con WAL activado (lecturas y escrituras no se bloquean entre sí)."""
+    conn = sqlite3.connect(path, timeout=10, **kwargs)
+    conn.execute("PRAGMA journal_mode=WAL")
+    # Con WAL, NORMAL solo sincroniza en los checkpoints: cada commit no espera un fsync
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def _to_text(value):
+    """Convierte un valor de la plantilla a texto para SQLite (NaN/NaT -> NULL)."""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    if isinstance(value, (datetime, pd.Timestamp)):
+        return value.strftime('%Y-%m-%d')
+    if isinstance(value, float) and value.is_integer():
+        # Números de empleado que openpyxl entrega como 36328.0
+        return str(int(value))
+    return str(value).strip()
+
+
+def _ensure_scan_schema(conn):
+    """Crea 'escaneos' o le agrega 'linea_sesion' si viene de una versión anterior."""
+    conn.execute(SCHEMA_ESCANEOS)
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(escaneos)")}
+    if 'linea_sesion' not in existing:
+        conn.execute("ALTER TABLE escaneos ADD COLUMN linea_sesion TEXT")
+
+
+def _ensure_roster_schema(conn):
+    """Agrega a 'empleados' las columnas e índices que usa la app (si faltan)."""
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(empleados)")}
+    if not existing:
+        conn.execute("CREATE TABLE empleados (numero TEXT PRIMARY KEY, nombre TEXT, linea TEXT, turno TEXT, puesto TEXT)")
+        existing = {'numero', 'nombre', 'linea', 'turno', 'puesto'}
+    for column, _ in ROSTER_COLUMNS:
+        if column not in existing:
+            conn.execute(f"ALTER TABLE empleados ADD COLUMN {column} TEXT")
+    # 'numero' es PRIMARY KEY, así que SQLite ya mantiene su índice único
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_empleados_linea ON empleados (linea)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_empleados_position ON empleados (position)")
+    conn.execute(SCHEMA_METADATOS)
+
+
+def import_roster(excel_path, path=DB_FILE, force=False):
+    """
+    Importa HDC.xlsx a la tabla 'empleados' leyendo el Excel en modo streaming.
+
+    Las filas se insertan por bloques dentro de una sola transacción, así que la
+    tabla nunca queda a medio importar. Si la firma del Excel coincide con la de
+    la última importación no se hace nada.
+    Devuelve True si se importó y False si la tabla ya estaba al día.
+    """
+    from openpyxl import load_workbook
+
+    mtime_ns, size, digest = file_signature(excel_path)
+    signature = f"{mtime_ns}:{size}:{digest}"
+
+    conn = connect(path)
+    try:
+        with conn:
+            _ensure_roster_schema(conn)
+        row = conn.execute("SELECT valor FROM metadatos WHERE clave = 'firma_plantilla'").fetchone()
+        if not force and row is not None and row[0] == signature:
+            return False
+
+        wb = load_workbook(excel_path, read_only=True, data_only=True)
+        try:
+            rows = wb.worksheets[0].iter_rows(values_only=True)
+            header = [str(h).strip() if h is not None else '' for h in next(rows, ())]
+            positions = [header.index(col) if col in header else None for _, col in ROSTER_COLUMNS]
+            if positions[0] is None:
+                raise ValueError(f"El archivo '{excel_path}' no tiene la columna 'Empleado'.")
+
+            columns = ', '.join(column for column, _ in ROSTER_COLUMNS)
+            placeholders = ', '.join('?' for _ in ROSTER_COLUMNS)
+            # Si un empleado aparece repetido se conserva la primera fila (igual que EmployeeIndex)
+            insert_sql = f"INSERT OR IGNORE INTO empleados ({columns}) VALUES ({placeholders})"
+
+            with conn:
+                conn.execute("DELETE FROM empleados")
+                chunk = []
+                for values in rows:
+                    record = tuple(_to_text(values[pos]) if pos is not None and pos < len(values) else None for pos in positions)
+                    if record[0] is None:
+                        continue
+                    chunk.append(record)
+                    if len(chunk) >= IMPORT_CHUNK_SIZE:
+                        conn.executemany(insert_sql, chunk)
+                        chunk = []
+                if chunk:
+                    conn.executemany(insert_sql, chunk)
+                conn.execute("INSERT OR REPLACE INTO metadatos (clave, valor) VALUES ('firma_plantilla', ?)", (signature,))
+        finally:
+            wb.close()
+        return True
+    finally:
+        conn.close()
+
+
+class ScanStore:
+    """
+    Guarda los escaneos en SQLite desde un hilo de fondo.
+
+    record() solo encola la fila; el hilo escritor agrupa las filas y hace un
+    commit por lote (cada batch_size filas o cada flush_interval segundos).
+    Un lote que no se pudo guardar se conserva y se reintenta; el aviso queda en
+    la cola `errors` para que la interfaz lo muestre desde su propio hilo.
+    """
+    def __init__(self, path=DB_FILE, batch_size=50, flush_interval=1.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        conn = connect(path)
+        with conn:
+            _ensure_scan_schema(conn)
+        conn.close()
+
+        self._queue = queue.Queue()
+        self.errors = queue.Queue() # Mensajes de lotes que fallaron (los lee el hilo de Tk)
+        self._writer = threading.Thread(target=self._write_loop, name="ScanStoreWriter", daemon=True)
+        self._writer.start()
+
+    def load_session(self, session):
+        """
+        Devuelve en una sola consulta los escaneos guardados de una sesión, en orden de registro,
+        como tuplas (numero, linea_sesion, datos). linea_sesion es None si no se guardó.
+        """
+        conn = connect(self.path)
+        try:
+            rows = conn.execute(SELECT_SESION, (session,)).fetchall()
+        finally:
+            conn.close()
+
+        restored = []
+        for numero, linea_sesion, nombre, linea, puesto, position, f_servicio in rows:
+            restored.append((numero, linea_sesion, {
+                'Nombre': nombre if nombre is not None else 'N/A',
+                'Linea': linea if linea is not None else 'N/A',
+                'Puesto': puesto if puesto is not None else 'N/A',
+                'POSITION': position if position is not None else 'N/A',
+                'F_Servicio': pd.Timestamp(f_servicio) if f_servicio else pd.NaT,
+            }))
+        return restored
+
+    def record(self, session, employee_id, emp_data, line=None):
+        """Encola un escaneo para guardarlo (no bloquea). `line` es la línea en la que se registró."""
+        self._queue.put((
+            session,
+            employee_id,
+            _to_text(emp_data.get('Nombre')),
+            _to_text(emp_data.get('Linea')),
+            _to_text(emp_data.get('Puesto')),
+            _to_text(emp_data.get('POSITION')),
+            _to_text(emp_data.get('F_Servicio')),
+            datetime.now().isoformat(timespec='seconds'),
+            line,
+        ))
+
+    def close(self):
+        """Escribe lo pendiente y detiene el hilo escritor."""
+        self._queue.put(None)
+        self._writer.join(timeout=5)
+
+    def _write_loop(self):
+        """Hilo escritor: agrupa las filas encoladas y las guarda por lotes."""
+        conn = connect(self.path)
+        batch = []
+        deadline = None # Momento en que el lote actual debe guardarse aunque no esté lleno
+        running = True
+        while running:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+                if item is None:
+                    running = False
+                else:
+                    if not batch:
+                        deadline = time.monotonic() + self.flush_interval
+                    batch.append(item)
+            except queue.Empty:
+                pass
+
+            if running and batch and (len(batch) >= self.batch_size or time.monotonic() >= deadline):
+                if self._flush(conn, batch):
+                    batch = []
+                    deadline = None
+                else:
+                    # El lote se conserva y se reintenta en el siguiente ciclo (junto con lo que llegue)
+                    deadline = time.monotonic() + self.flush_interval
+
+        # Al cerrar: lo pendiente se reintenta unas cuantas veces (p. ej. si la base está bloqueada)
+        for _ in range(CLOSE_RETRIES):
+            if not batch or self._flush(conn, batch):
+                batch = []
+                break
+            time.sleep(CLOSE_RETRY_DELAY)
+        if batch:
+            print(f"Se perdieron {len(batch)} escaneos que no se pudieron guardar en '{self.path}'")
+        conn.close()
+
+    def _flush(self, conn, batch):
+        """Guarda un lote en una transacción. Si falla, avisa por `errors` y devuelve False."""
+        try:
+            with conn:
+                conn.executemany(INSERT_ESCANEO, batch)
+        except sqlite3.Error as e:
+            message = f"No se pudieron guardar {len(batch)} escaneos en '{self.path}' (se reintentará): {e}"
+            print(message)
+            self.errors.put(message)
+            return False
+        return True
@@ -0,0 +1,111 @@
+"""
+Caché binaria en disco para los archivos Excel que cargan las aplicaciones.
+
+Leer un .xlsx con openpyxl tarda varios segundos en las PCs de los kioscos.
+Este módulo guarda una copia del DataFrame ya procesado (pickle) junto con la
+firma del archivo de origen (fecha de modificación, tamaño y hash). Mientras
+el Excel no cambie, la siguiente carga lee el pickle en milisegundos.
+"""
+import hashlib
+import os
+import pickle
+
+# Carpeta donde se guardan las cachés (relativa al directorio de trabajo)
+CACHE_DIR = '.cache'
+
+# Se incrementa si cambia el formato del archivo de caché
+CACHE_FORMAT_VERSION = 1
+
+
+def file_signature(path, with_hash=True):
+    """Devuelve la firma (mtime_ns, tamaño, sha1) de un archivo."""
+    st = os.stat(path)
+    digest = None
+    if with_hash:
+        h = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+        digest = h.hexdigest()
+    return st.st_mtime_ns, st.st_size, digest
+
+
+def cache_path_for(path, cache_dir=CACHE_DIR):
+    """Ruta del archivo de caché que corresponde a un Excel."""
+    name = os.path.basename(path)
+    # Dos Excel con el mismo nombre en carpetas distintas no comparten caché
+    path_hash = hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()[:12]
+    return os.path.join(cache_dir, f"{name}.{path_hash}.pkl")
+
+
+def _read_cache(cache_file):
+    """Lee un archivo de caché; devuelve None si no existe o está dañado."""
+    try:
+        with open(cache_file, 'rb') as f:
+            payload = pickle.load(f)
+    except Exception:
+        # Un pickle dañado puede lanzar casi cualquier excepción: siempre cuenta como caché inválida
+        return None
+    if not isinstance(payload, dict) or payload.get('format') != CACHE_FORMAT_VERSION or 'df' not in payload:
+        return None
+    return payload
+
+
+def _write_cache(cache_file, payload):
+    """Escribe la caché de forma atómica (archivo temporal + reemplazo)."""
+    os.makedirs(os.path.dirname(cache_file) or '.', exist_ok=True)
+    tmp_file = f"{cache_file}.tmp"
+    with open(tmp_file, 'wb') as f:
+        pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_file, cache_file)
+
+
+def load_excel_cached(path, reader, variant='', cache_dir=CACHE_DIR):
+    """
+    Carga un Excel usando la caché en disco.
+
+    reader: función que recibe la ruta y devuelve el DataFrame ya procesado;
+            solo se llama cuando la caché no es válida.
+    variant: texto que identifica las opciones de lectura (columnas, tipos...);
+             si cambia, la caché anterior deja de ser válida.
+
+    Devuelve una tupla (DataFrame, hit) donde hit indica si se usó la caché.
+    """
+    cache_file = cache_path_for(path, cache_dir)
+    mtime_ns, size, digest = file_signature(path, with_hash=False)
+
+    payload = _read_cache(cache_file)
+    if payload is not None and payload.get('variant') == variant:
+        # Camino rápido: misma fecha y tamaño, no hace falta calcular el hash
+        if payload.get('mtime_ns') == mtime_ns and payload.get('size') == size:
+            return payload['df'], True
+
+        # El archivo se tocó (copiado, descargado de nuevo...) pero puede tener el mismo contenido
+        _, _, digest = file_signature(path)
+        if payload.get('size') == size and payload.get('sha1') == digest:
+            payload['mtime_ns'] = mtime_ns
+            try:
+                _write_cache(cache_file, payload)
+            except OSError:
+                pass
+            return payload['df'], True
+
+    # Caché inexistente o desactualizada: leer el Excel y regenerarla.
+    # La firma se toma antes de leer: si el archivo cambia durante la lectura, la caché
+    # queda con la firma anterior y la siguiente carga vuelve a leer el Excel.
+    if digest is None:
+        mtime_ns, size, digest = file_signature(path)
+    df = reader(path)
+    try:
+        _write_cache(cache_file, {
+            'format': CACHE_FORMAT_VERSION,
+            'variant': variant,
+            'mtime_ns': mtime_ns,
+            'size': size,
+            'sha1': digest,
+            'df': df,
+        })
+    except OSError:
+        # Sin permisos de escritura: la app sigue funcionando, solo sin caché
+        pass
+    return df, False
@@ -0,0 +1,115 @@
+"""
+Exportación del reporte de turno: empleados registrados, desglose por pestaña
+y programado vs registrado.
+
+El reporte se escribe en streaming, fila por fila: el CSV con csv.writer y el
+xlsx con openpyxl en modo write-only, así que nunca se arma el libro completo
+en memoria. Está pensado para ejecutarse en un hilo de fondo: recibe una
+instantánea de las sesiones (ReportSection) y no toca ningún widget.
+"""
+import csv
+import os
+from collections import Counter, namedtuple
+
+ROW_HEADERS = ['Línea Sesión', 'ID Empleado', 'Nombre', 'Línea', 'Puesto', 'POSITION', 'F Servicio',
+               'Antigüedad (años)', 'Antigüedad (días)', 'Experiencia']
+SUMMARY_HEADERS = ['Línea Sesión', 'Concepto', 'Programado', 'Registrado', 'Diferencia']
+
+# Una sesión de línea lista para exportar:
+#   line    -> línea de la sesión (None en modo de sesión única)
+#   rows    -> iterable (puede ser un generador) de (valores según ROW_HEADERS, pestañas a las que pertenece)
+#   summary -> lista de (concepto, programado, registrado); programado None si no aplica
+ReportSection = namedtuple('ReportSection', ['line', 'rows', 'summary'])
+
+
+def _summary_rows(section, tab_counts, tab_names):
+    """Filas del resumen de una sesión: programado vs registrado y cuántos empleados hay en cada pestaña."""
+    line = section.line or ''
+    for concepto, programado, registrado in section.summary:
+        diferencia = registrado - programado if programado is not None else None
+        yield (line, concepto, programado, registrado, diferencia)
+    for tab_name in tab_names:
+        yield (line, f"Pestaña: {tab_name}", None, tab_counts[tab_name], None)
+
+
+def _write_csv(path, summary_path, sections, tab_names):
+    """Empleados en `path` (una columna Sí/No por pestaña) y el resumen en `summary_path`."""
+    total = 0
+    summaries = []
+    with open(path, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.writer(f)
+        writer.writerow(ROW_HEADERS + tab_names)
+        for section in sections:
+            tab_counts = Counter()
+            for values, tabs in section.rows:
+                tab_counts.update(tabs)
+                writer.writerow(list(values) + ["Sí" if tab_name in tabs else "No" for tab_name in tab_names])
+                total += 1
+            summaries.append((section, tab_counts))
+
+    with open(summary_path, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.writer(f)
+        writer.writerow(SUMMARY_HEADERS)
+        for section, tab_counts in summaries:
+            writer.writerows(_summary_rows(section, tab_counts, tab_names))
+    return total
+
+
+def _write_xlsx(path, sections, tab_names):
+    """Libro write-only: hoja 'Resumen' y una hoja por pestaña, escritas en una sola pasada."""
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    summary_sheet = wb.create_sheet("Resumen")
+    summary_sheet.append(SUMMARY_HEADERS)
+    tab_sheets = {}
+    for tab_name in tab_names:
+        # Los nombres de hoja de Excel no admiten '/' ni más de 31 caracteres
+        sheet = wb.create_sheet(tab_name.replace('/', '-')[:31])
+        sheet.append(ROW_HEADERS)
+        tab_sheets[tab_name] = sheet
+
+    total = 0
+    for section in sections:
+        tab_counts = Counter()
+        for values, tabs in section.rows:
+            tab_counts.update(tabs)
+            for tab_name in tabs:
+                tab_sheets[tab_name].append(values)
+            total += 1
+        for row in _summary_rows(section, tab_counts, tab_names):
+            summary_sheet.append(row)
+
+    wb.save(path)
+    return total
+
+
+def write_report(path, sections, tab_names):
+    """
+    Escribe el reporte en `path` (.xlsx o .csv) y devuelve cuántos empleados se exportaron.
+    Para .csv el resumen va en un segundo archivo '<nombre>_resumen.csv'. Los archivos se
+    escriben primero como temporales, así que un error nunca deja un reporte a medias.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in ('.xlsx', '.csv'):
+        raise ValueError(f"Formato de exportación no soportado: '{ext}' (use .xlsx o .csv)")
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+
+    targets = [path]
+    if ext == '.csv':
+        targets.append(os.path.splitext(path)[0] + '_resumen.csv')
+    temps = [f"{target}.{os.getpid()}.tmp" for target in targets]
+    try:
+        if ext == '.csv':
+            total = _write_csv(temps[0], temps[1], sections, tab_names)
+        else:
+            total = _write_xlsx(temps[0], sections, tab_names)
+        for tmp, target in zip(temps, targets):
+            os.replace(tmp, target)
+    finally:
+        for tmp in temps:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+    return total
@@ -0,0 +1,129 @@
+"""
+Reporte de reposición del chatbot: todas las líneas del carrito en un solo archivo.
+
+El reporte de texto se arma completo en memoria (io.StringIO) y se escribe con
+una sola llamada de escritura. Opcionalmente se genera un archivo gemelo .csv o
+.json, con una fila por circuito, para que lo importe el sistema del almacén.
+"""
+import csv
+import io
+import json
+import os
+from collections import namedtuple
+
+# Una línea del carrito de reposición:
+#   tipo     -> 'directo' o 'proceso'
+#   alcance  -> None (directo), 'full_group' o 'single_circuit'
+#   proceso  -> proceso identificado (None en un directo)
+#   cantidad -> piezas a reponer
+#   items    -> filas de la BDD (dicts columna -> valor) que cubre la línea
+RepositionLine = namedtuple('RepositionLine', ['tipo', 'alcance', 'proceso', 'cantidad', 'items'])
+
+SCOPE_NAMES = {'full_group': 'Grupo Completo', 'single_circuit': 'Circuito Específico'}
+
+# Tabla del reporte de texto: (encabezado, ancho)
+TABLE_COLUMNS = [('NUMERO DE PARTE', 28), ('CODIGO', 15), ('CIRCUITO A', 15), ('CIRCUITO B', 15),
+                 ('PROCESO', 15), ('CANTIDAD', 12), ('GRUPO(SI/NO)', 15), ('PLANTA', 10)]
+
+# Columnas del archivo gemelo para el almacén (una fila por circuito)
+SIDECAR_FIELDS = ['fecha', 'linea', 'tipo', 'alcance', 'proceso', 'numero_sencillo', 'codigo',
+                  'cod_a', 'cod_b', 'planta', 'cantidad', 'grupo']
+
+
+def _is_missing(value):
+    return value is None or (isinstance(value, float) and value != value)
+
+
+def _text(value):
+    """Valor de la BDD para el reporte de texto ('N/A' si falta)."""
+    return 'N/A' if _is_missing(value) else str(value)
+
+
+def _table_row(values):
+    return ''.join(f"{value:<{width}}" for value, (_, width) in zip(values, TABLE_COLUMNS))
+
+
+def _item_row(line, item):
+    """Valores de la tabla del reporte para un circuito de una línea del carrito."""
+    return [_text(item.get('Numero Sencillo')), _text(item.get('Codigos')), _text(item.get('Cod A')),
+            _text(item.get('Cod B')), _text(item.get('Proceso')), str(line.cantidad),
+            "SI" if line.alcance == 'full_group' else "NO", _text(item.get('Planta'))]
+
+
+def render_report(lines, generated_at):
+    """Texto completo del reporte (todas las líneas del carrito), armado en memoria."""
+    out = io.StringIO()
+    out.write("--- REPORTE DE REPOSICIÓN ---\n")
+    out.write(f"Fecha y Hora: {generated_at.strftime('%Y-%m-%d %H:%M:%S')}\n")
+    out.write(f"Reposiciones: {len(lines)} ({sum(len(line.items) for line in lines)} circuitos, "
+              f"{sum(line.cantidad for line in lines)} piezas)\n")
+    out.write("-" * 30 + "\n")
+
+    for number, line in enumerate(lines, 1):
+        out.write(f"\n=== Reposición {number}: {line.tipo.upper()} ===\n")
+        if line.tipo == 'directo':
+            out.write(f"Código Directo: {_text(line.items[0].get('Numero Sencillo')) if line.items else 'N/A'}\n")
+        else:
+            out.write(f"Código de Proceso Identificado: {line.proceso}\n")
+            out.write(f"Alcance de Reposición: {SCOPE_NAMES.get(line.alcance, line.alcance)}\n")
+        out.write(f"Cantidad a Reponer: {line.cantidad} piezas\n\n")
+
+        out.write(_table_row([header for header, _ in TABLE_COLUMNS]) + "\n")
+        out.write(_table_row(['-' * width for _, width in TABLE_COLUMNS]) + "\n")
+        for item in line.items:
+            out.write(_table_row(_item_row(line, item)) + "\n")
+
+        out.write("\nDetalles Completos (BDD):\n")
+        for i, item in enumerate(line.items, 1):
+            if len(line.items) > 1:
+                out.write(f"\n--- Item Único {i} ({_text(item.get('Numero Sencillo'))}) ---\n")
+            for col, value in item.items():
+                out.write(f"  {col}: {_text(value)}\n")
+    return out.getvalue()
+
+
+def _sidecar_rows(lines, generated_at):
+    fecha = generated_at.isoformat(timespec='seconds')
+    for number, line in enumerate(lines, 1):
+        for item in line.items:
+            values = [fecha, number, line.tipo, line.alcance, line.proceso or item.get('Proceso'),
+                      item.get('Numero Sencillo'), item.get('Codigos'), item.get('Cod A'), item.get('Cod B'),
+                      item.get('Planta'), line.cantidad, line.alcance == 'full_group']
+            yield {field: None if _is_missing(value) else value for field, value in zip(SIDECAR_FIELDS, values)}
+
+
+def _render_sidecar(lines, generated_at, fmt):
+    out = io.StringIO()
+    rows = _sidecar_rows(lines, generated_at)
+    if fmt == 'csv':
+        writer = csv.DictWriter(out, fieldnames=SIDECAR_FIELDS, lineterminator='\n')
+        writer.writeheader()
+        writer.writerows(rows)
+    else:
+        json.dump(list(rows), out, ensure_ascii=False, indent=2, default=str)
+    return out.getvalue()
+
+
+def write_report(path, lines, generated_at, sidecar=None):
+    """
+    Escribe el reporte de texto en `path` con una sola escritura y devuelve (texto, archivos escritos).
+    `sidecar` ('csv' o 'json') agrega '<nombre>.csv' / '<nombre>.json' para el sistema del almacén.
+    """
+    if sidecar not in (None, 'csv', 'json'):
+        raise ValueError(f"Formato de archivo gemelo no soportado: '{sidecar}' (use 'csv' o 'json')")
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+
+    report = render_report(lines, generated_at)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(report)
+    written = [path]
+
+    if sidecar is not None:
+        sidecar_path = f"{os.path.splitext(path)[0]}.{sidecar}"
+        # utf-8-sig: Excel abre el CSV con los acentos correctos (igual que export_empleados)
+        with open(sidecar_path, 'w', newline='', encoding='utf-8-sig' if sidecar == 'csv' else 'utf-8') as f:
+            f.write(_render_sidecar(lines, generated_at, sidecar))
+        written.append(sidecar_path)
+    return report, written
@@ -0,0 +1,123 @@
+"""
+Instrumentación del escaneo de empleados.
+
+Mide cuánto tarda cada etapa de un escaneo (búsqueda en la plantilla, registro,
+estadísticas y refresco de tablas) y guarda las últimas muestras en un buffer
+circular de tamaño fijo. Con esas muestras calcula p50/p95/p99 y los escaneos
+por minuto, que se muestran en la ventana de diagnóstico y se escriben cada
+cierto número de escaneos en un log rotativo.
+"""
+import logging
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+
+import numpy as np
+
+# Log rotativo de métricas (relativo al directorio de trabajo)
+METRICS_LOG_FILE = 'escaneos_metricas.log'
+METRICS_LOG_MAX_BYTES = 1024 * 1024
+METRICS_LOG_BACKUPS = 3
+
+# Cuántas muestras por etapa se conservan y cada cuántos escaneos se escribe un resumen
+RING_SIZE = 1000
+LOG_EVERY_SCANS = 100
+
+# Etapas medidas, en el orden en que se muestran
+# 'total' es la latencia completa: desde el <Return> del lector hasta terminar el refresco
+STAGES = ('busqueda', 'registro', 'estadisticas', 'tablas', 'total')
+
+PERCENTILES = (50, 95, 99)
+
+
+def _build_logger(log_file):
+    """Devuelve el logger de métricas con su RotatingFileHandler (uno solo por archivo)."""
+    logger = logging.getLogger('app_empleados.metricas')
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    if log_file is None:
+        return logger
+    for handler in logger.handlers:
+        if isinstance(handler, RotatingFileHandler) and handler.baseFilename == os.path.abspath(log_file):
+            return logger
+    try:
+        handler = RotatingFileHandler(log_file, maxBytes=METRICS_LOG_MAX_BYTES, backupCount=METRICS_LOG_BACKUPS, encoding='utf-8')
+    except OSError as e:
+        print(f"No se pudo abrir el log de métricas '{log_file}': {e}")
+        return logger
+    handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+    logger.addHandler(handler)
+    return logger
+
+
+class ScanMetrics:
+    """Tiempos por etapa de los últimos escaneos (buffer circular) y ritmo de escaneo."""
+
+    def __init__(self, ring_size=RING_SIZE, log_file=METRICS_LOG_FILE, log_every=LOG_EVERY_SCANS):
+        self.ring_size = ring_size
+        self.samples = {stage: deque(maxlen=ring_size) for stage in STAGES}
+        # Momento (monotonic) de cada escaneo procesado, para escaneos por minuto
+        self.scan_times = deque(maxlen=ring_size)
+        self.total_scans = 0
+        self.log_every = log_every
+        self._since_log = 0
+        self.logger = _build_logger(log_file)
+
+    def record(self, stage, seconds):
+        """Agrega una muestra (en segundos) a la etapa indicada."""
+        samples = self.samples.get(stage)
+        if samples is None:
+            samples = self.samples[stage] = deque(maxlen=self.ring_size)
+        samples.append(seconds)
+
+    @contextmanager
+    def stage(self, name):
+        """Mide el bloque `with` como una muestra de la etapa `name`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def mark_scan(self, count=1):
+        """Cuenta escaneos procesados y escribe un resumen en el log cada `log_every`."""
+        now = time.monotonic()
+        for _ in range(count):
+            self.scan_times.append(now)
+        self.total_scans += count
+        self._since_log += count
+        if self.log_every and self._since_log >= self.log_every:
+            self.log_summary()
+
+    def percentiles(self, stage):
+        """Devuelve (n, p50, p95, p99) en milisegundos, o None si la etapa no tiene muestras."""
+        samples = self.samples.get(stage)
+        if not samples:
+            return None
+        values = np.percentile(np.fromiter(samples, dtype=float, count=len(samples)), PERCENTILES) * 1000.0
+        return (len(samples),) + tuple(float(v) for v in values)
+
+    def scans_per_minute(self, window=60.0):
+        """Escaneos procesados en el último `window` segundos, expresados por minuto."""
+        cutoff = time.monotonic() - window
+        recent = sum(1 for t in reversed(self.scan_times) if t >= cutoff) if self.scan_times else 0
+        return recent * 60.0 / window
+
+    def summary_lines(self):
+        """Resumen legible: una línea por etapa con muestras más el ritmo de escaneo."""
+        lines = [f"Escaneos: {self.total_scans}  |  Ritmo: {self.scans_per_minute():.1f} escaneos/min"]
+        for stage in self.samples:
+            stats = self.percentiles(stage)
+            if stats is None:
+                continue
+            n, p50, p95, p99 = stats
+            lines.append(f"{stage:<13} n={n:<5} p50={p50:8.2f} ms  p95={p95:8.2f} ms  p99={p99:8.2f} ms")
+        return lines
+
+    def log_summary(self):
+        """Escribe el resumen actual en el log rotativo."""
+        self._since_log = 0
+        for line in self.summary_lines():
+            self.logger.info(line)
@@ -0,0 +1,30 @@
+"""Pruebas de read_badge_file (importación de lote desde el archivo de un lector de gafetes)."""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from app_empleados import read_badge_file  # noqa: E402
+
+
+def leer(tmp_path, texto):
+    path = tmp_path / "lector.csv"
+    path.write_text(texto, encoding='utf-8')
+    return read_badge_file(str(path))
+
+
+def test_fecha_al_inicio_de_la_linea_no_es_el_gafete(tmp_path):
+    ids, skipped = leer(tmp_path, "20240105,12345\n20240105083000;\"98765\"\n202401050830 55501\n")
+    assert ids == ['12345', '98765', '55501']
+    assert skipped == []
+
+
+def test_comillas_ids_largos_y_lineas_sin_id(tmp_path):
+    ids, skipped = leer(tmp_path, "Empleado,Fecha,Hora\n\"12347\",2024-01-05,08:00\n123456789012;x\n\nsin id\n")
+    assert ids == ['12347', '123456789012']
+    assert skipped == [(1, 'Empleado,Fecha,Hora'), (5, 'sin id')]
+
+
+def test_linea_que_solo_tiene_una_fecha_se_reporta(tmp_path):
+    ids, skipped = leer(tmp_path, "20240105\n36328\n")
+    assert ids == ['36328']
+    assert skipped == [(1, '20240105')]